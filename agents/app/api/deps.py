@@ -0,0 +1,99 @@
+"""
+Heavy dependencies of the routes, loaded lazily (see app.core.lazy).
+
+Importing the API only needs FastAPI, the request models and the
+arduino-cli services. The agents, their runners, the retriever and the
+caches are imported by `warm_up`, which the server starts in the
+background once it is accepting requests. Agent routes depend on
+`require_services`: a request that arrives before the warm-up is done
+waits for the same load instead of importing on the event loop.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict
+
+from app.core.lazy import LazyRegistry
+
+logger = logging.getLogger("Deps")
+
+
+def _response_cache():
+    from app.core.response_cache import ResponseCache
+    from app.core.retriever import embeddings
+
+    # final responses of the topic-driven endpoints, matched exactly or by
+    # topic embedding similarity (see app.core.response_cache)
+    return ResponseCache(embeddings=embeddings)
+
+
+services = LazyRegistry({
+    # agents
+    "name_agent": "app.services.expert.assistants:name_agent",
+    "desc_agent": "app.services.expert.assistants:desc_agent",
+    "wiring_agent": "app.services.expert.assistants:wiring_agent",
+    "code_agent": "app.services.expert.assistants:code_agent",
+    "qa_agent": "app.services.expert.assistants:qa_agent",
+    "basic_agent": "app.services.beginner.basics:root_agent",
+    "adaptive_agent": "app.services.beginner.dynamic:root_agent",
+    # running them
+    "runner_pool": "app.core.runner_pool:runner_pool",
+    "run_agent": "app.core.utils:run_agent",
+    "run_agent_with_retry": "app.core.utils:run_agent_with_retry",
+    "stream_agent": "app.core.streaming:stream_agent",
+    "merge_streams": "app.core.streaming:merge_streams",
+    "sse_response": "app.core.streaming:sse_response",
+    # caches and indexes
+    "response_cache": _response_cache,
+    "stage_cache": "app.core.stage_cache:stage_cache",
+    "normalize_text": "app.core.embedding_cache:normalize_text",
+    "embedding_cache_stats": "app.core.retriever:embedding_cache_stats",
+    "content_db": "app.core.retriever:content_db",
+    "code_db": "app.core.retriever:code_db",
+})
+
+AGENTS = ("name_agent", "desc_agent", "wiring_agent", "code_agent", "qa_agent", "basic_agent", "adaptive_agent")
+INDEXES = ("content_db", "code_db")
+
+warmup: Dict = {"started": None, "finished": None, "errors": {}}
+
+
+async def require_services() -> None:
+    """
+    Route dependency: the registry is loaded (waits for the warm-up).
+    """
+    await services.load()
+
+
+async def warm_up() -> None:
+    """
+    Background start-up work: import and build the agents, create their
+    runners and open the FAISS indexes. A failure is logged and reported
+    by /readyz; whatever failed is retried on first use.
+    """
+    warmup["started"] = time.time()
+    start = time.perf_counter()
+    try:
+        await services.load()
+        for name in AGENTS:
+            services.runner_pool.warm(services.get(name))
+        for name in INDEXES:
+            try:
+                await asyncio.to_thread(services.get(name).warm)
+            except Exception as e:
+                warmup["errors"][name] = str(e)
+                logger.warning(f"⚠️ Could not preload {name}: {e}")
+    except Exception as e:
+        warmup["errors"]["services"] = str(e)
+        logger.error(f"❌ Warm-up failed: {e}")
+    warmup["finished"] = time.time()
+    logger.info(f"✅ Warm-up done in {time.perf_counter() - start:.2f}s")
+
+
+def readiness() -> Dict:
+    return {
+        "ready": services.loaded and warmup["finished"] is not None,
+        "warm_up": warmup,
+        "services": services.stats(),
+    }
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 import asyncio
 import os
-import subprocess
 import json
 from dotenv import load_dotenv
 
@@ -10,26 +10,143 @@ from app.core.models import (
     CodeAgentResponse, QARequest, QAResponse, ProjectNameResponse,
     BasicModulesResponse, AdaptiveModulesResponse, CompileRequest, FlashRequest
 )
-from app.services.expert.assistants import (
-    desc_runner, wiring_runner, code_runner, qa_runner, name_runner
-)
-from app.core.utils import run_agent, run_agent_with_retry
-# Import Beginner Agents
-from app.services.beginner.basics import root_agent as basic_runner
-# Import Dynamic Agents
-from app.services.beginner.dynamic import root_agent as adaptive_runner
+# Agents, runners, caches and indexes are loaded lazily (app.api.deps)
+from app.api.deps import services, require_services, readiness
+from app.core.singleflight import SingleFlight
+from app.core.telemetry import registry
+from app.core.usage import ledger, usage_scope, TokenBudgetExceeded
+from app.config import ROUTE_TOKEN_BUDGETS
+
+from app.services.arduino import compiler, CompileError, sketch_store, SketchNotFound, board_watcher
 
 from app.core.formatter import format_output, extract_text_only
 from app.core.structurer import structure_beginner_output 
 
 router = APIRouter()
 
-LAST_PROJECT_FILE = None
 load_dotenv()
 
+# routes that run agents wait for them to be loaded
+AGENT_DEPS = [Depends(require_services)]
+
+# identical concurrent requests (same endpoint + topic) share one agent run
+in_flight = SingleFlight()
+
+def project_filter_hint(topic: str) -> str:
+    """
+    Prompt suffix asking the agent to scope retrieval to the known project.
+    The retriever falls back to an unfiltered search if no title matches.
+    """
+    return f'\n\nWhen calling the retrieval tools, pass project="{topic}".'
+
+# --- Prompts & output shaping (shared by the blocking and /stream endpoints) ---
+
+def desc_prompt(topic: str) -> str:
+    return f"Provide a description and briefing for the project: {topic}{project_filter_hint(topic)}"
+
+def wiring_prompt(topic: str) -> str:
+    return f"Provide components, wiring, and step-by-step building process for the project: {topic}{project_filter_hint(topic)}"
+
+def code_prompt(topic: str) -> str:
+    return f"Extract and provide the code for the project: {topic}{project_filter_hint(topic)}"
+
+def basics_prompt(topic: str) -> str:
+    if topic:
+        return f"Create me 4 modules that will have detailes information on basic topics related to {topic} that will brush up the basics of electronics and embedded systems for an engineering student. And keep the info very detailed and comprehensive."
+    return "Create me 4 modules that will have detailes information on any basic topic that will brush up the basics of electronics and embedded systems for an engineering student. And keep the info very detailed and comprehensive."
+
+def troubleshoot_prompt(request: QARequest) -> str:
+    context = ""
+    if request.project_topic:
+        context = f"Context Project: {request.project_topic}. "
+    return f"{context}User Query: {request.query}"
+
+async def main_agent_response(desc_result, wiring_result) -> MainAgentResponse:
+    desc_output = await structure_beginner_output(desc_result)
+    if not desc_output.strip():
+         desc_output = str(desc_result)
+
+    wiring_output = format_output(str(wiring_result))
+    if not wiring_output.strip():
+         wiring_output = str(wiring_result)
+
+    return MainAgentResponse(
+        description_agent_output=desc_output,
+        wiring_agent_output=wiring_output
+    )
+
+async def code_agent_response(response) -> CodeAgentResponse:
+    clean_response = await structure_beginner_output(response)
+    if not clean_response.strip():
+        clean_response = str(response)
+    return CodeAgentResponse(code=clean_response)
+
+def save_sketch(response: CodeAgentResponse, session_id: str = None) -> CodeAgentResponse:
+    # Store the code for arduino-cli (content-addressed, per session)
+    sketch_id = sketch_store.save(response.code, session_id)
+    print(f"💾 Saved sketch {sketch_id}")
+    return response.model_copy(update={"sketch_id": sketch_id})
+
+def troubleshoot_response(response) -> QAResponse:
+    clean_response = format_output(str(response))
+    if not clean_response.strip():
+        clean_response = str(response)
+    return QAResponse(response=clean_response)
+
+async def collect_deltas(stream, texts: dict, target_agent: str = None):
+    """
+    Forward an agent stream as `delta` frames, accumulating the text per
+    author (only `target_agent`'s when given) for the final frame.
+    """
+    async for author, delta in stream:
+        if not target_agent or author == target_agent:
+            texts[author] = texts.get(author, "") + delta
+        yield "delta", {"agent": author, "text": delta}
+
+async def run_together(*runs):
+    """
+    Like asyncio.gather, but the first failure cancels the other runs, so
+    no orphaned agent run keeps spending rate-limit tokens and budget
+    after the request has failed. Raises that first error.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run) for run in runs]
+    except BaseExceptionGroup as errors:
+        raise errors.exceptions[0]
+    return [task.result() for task in tasks]
+
+async def store_response(endpoint: str, topic: str, response) -> None:
+    """
+    Cache a response unless an agent came back empty (or failed: run_agent
+    returns None, which the output shaping turns into "None").
+    """
+    payload = response.model_dump(exclude_none=True)
+    if all(str(value).strip() not in ("", "None") for value in payload.values()):
+        await services.response_cache.put(endpoint, topic, payload)
+
+async def cached_response(endpoint: str, topic: str, response_model, compute):
+    """
+    Serve a repeated topic from the response cache, else run `compute`
+    (the agent call, within the endpoint's token budget) and cache its
+    result. Concurrent identical requests are coalesced into a single
+    lookup/run.
+    """
+    async def lookup_or_compute():
+        hit = await services.response_cache.get(endpoint, topic)
+        if hit is not None:
+            print(f"⚡ Cache hit for {endpoint}: {topic}")
+            return response_model(**hit)
+        with usage_scope(endpoint, topic):
+            response = await compute()
+        await store_response(endpoint, topic, response)
+        return response
+
+    return await in_flight.do((endpoint, services.normalize_text(topic)), lookup_or_compute)
+
 # --- Endpoints ---
 
-@router.post("/project-name", response_model=ProjectNameResponse)
+@router.post("/project-name", response_model=ProjectNameResponse, dependencies=AGENT_DEPS)
 async def get_project_name(request: ProjectDescriptionRequest):
     """
     Identifies the project name from a user's description by searching the vector database.
@@ -38,7 +155,8 @@ async def get_project_name(request: ProjectDescriptionRequest):
     print(f"🔍 Identifying project for: {description[:50]}...")
     
     try:
-        response = await run_agent_with_retry(name_runner, f"Find the project name for this description: {description}")
+        with usage_scope("/project-name"):
+            response = await services.run_agent_with_retry(services.name_agent, f"Find the project name for this description: {description}")
         
         # Clean output: we expect just the name
         clean_name = await structure_beginner_output(response)
@@ -46,215 +164,325 @@ async def get_project_name(request: ProjectDescriptionRequest):
              clean_name = str(response)
         
         return ProjectNameResponse(project_name=clean_name)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/main-agent", response_model=MainAgentResponse)
+@router.post("/main-agent", response_model=MainAgentResponse, dependencies=AGENT_DEPS)
 async def run_main_agent(request: ProjectRequest):
     topic = request.project_topic
     print(f"📋 Running Main Agent (Description + Wiring) for: {topic}")
     
-    try:
-        # Run sub-agents sequentially to avoid 429 Resource Exhausted (Rate Limit)
-        
-        # 1. Description Agent
-        print("   > starting description agent...")
-        desc_result = await run_agent_with_retry(desc_runner, f"Provide a description and briefing for the project: {topic}")
-        desc_output = await structure_beginner_output(desc_result)
-        if not desc_output.strip():
-             desc_output = str(desc_result)
-        
-        # Short delay between sequential calls + the retry logic safety inside the helper
-        await asyncio.sleep(2) 
-        
-        # 2. Wiring Agent
-        print("   > starting wiring agent...")
-        wiring_result = await run_agent_with_retry(wiring_runner, f"Provide components, wiring, and step-by-step building process for the project: {topic}")
-        wiring_output = format_output(str(wiring_result))
-        if not wiring_output.strip():
-             wiring_output = str(wiring_result)
-        
-        return MainAgentResponse(
-            description_agent_output=desc_output,
-            wiring_agent_output=wiring_output
+    async def compute():
+        # Both agents run concurrently; the shared rate limiter in the model
+        # wrapper (app.core.rate_limit) paces their Gemini calls to avoid 429s
+        print("   > starting description and wiring agents...")
+        desc_result, wiring_result = await run_together(
+            services.run_agent_with_retry(services.desc_agent, desc_prompt(topic)),
+            services.run_agent_with_retry(services.wiring_agent, wiring_prompt(topic)),
         )
+        return await main_agent_response(desc_result, wiring_result)
+
+    try:
+        return await cached_response("/main-agent", topic, MainAgentResponse, compute)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         print(f"❌ Main Agent Failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/code-agent", response_model=CodeAgentResponse)
+@router.post("/code-agent", response_model=CodeAgentResponse, dependencies=AGENT_DEPS)
 async def run_code_agent(request: ProjectRequest):
-    global LAST_PROJECT_FILE
     topic = request.project_topic
+
+    async def compute():
+        response = await services.run_agent_with_retry(services.code_agent, code_prompt(topic))
+        return await code_agent_response(response)
+
     try:
-        response = await run_agent_with_retry(code_runner, f"Extract and provide the code for the project: {topic}")
-        clean_response = await structure_beginner_output(response)
-        if not clean_response.strip():
-            clean_response = str(response)
-
-        # Save code to file for arduino-cli
-        # Create a valid sketch directory and file name
-        import time
-        timestamp = int(time.time())
-        project_name = f"Project_{timestamp}"
-        sketch_dir = os.path.join(os.getcwd(), "sketches", project_name)
-        os.makedirs(sketch_dir, exist_ok=True)
-        
-        sketch_path = os.path.join(sketch_dir, f"{project_name}.ino")
-        with open(sketch_path, "w") as f:
-            f.write(clean_response)
-            
-        LAST_PROJECT_FILE = sketch_path
-        print(f"💾 Saved sketch to: {LAST_PROJECT_FILE}")
-        return CodeAgentResponse(code=clean_response)
+        response = await cached_response("/code-agent", topic, CodeAgentResponse, compute)
+        return save_sketch(response, request.session_id)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/beginner/basics", response_model=BasicModulesResponse)
+@router.post("/beginner/basics", response_model=BasicModulesResponse, dependencies=AGENT_DEPS)
 async def run_basic_modules(request: ProjectRequest):
     # If a topic is provided, we can tailor the basics, otherwise use a default
     topic = request.project_topic
-    if topic:
-        prompt = f"Create me 4 modules that will have detailes information on basic topics related to {topic} that will brush up the basics of electronics and embedded systems for an engineering student. And keep the info very detailed and comprehensive."
-    else:
-        prompt = "Create me 4 modules that will have detailes information on any basic topic that will brush up the basics of electronics and embedded systems for an engineering student. And keep the info very detailed and comprehensive."
-    
+    prompt = basics_prompt(topic)
+
     print(f"📚 Running Basic Modules Agent for: {topic if topic else 'General'}")
-    try:
-        response = await run_agent(basic_runner, prompt, timeout=300, target_agent="initial_modules_agent")
+    async def compute():
+        response = await services.run_agent(services.basic_agent, prompt, timeout=300, target_agent="initial_modules_agent")
         clean_response = await structure_beginner_output(str(response))
         return BasicModulesResponse(modules=clean_response)
+
+    try:
+        return await cached_response("/beginner/basics", topic, BasicModulesResponse, compute)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/beginner/adaptive", response_model=AdaptiveModulesResponse)
+@router.post("/beginner/adaptive", response_model=AdaptiveModulesResponse, dependencies=AGENT_DEPS)
 async def run_adaptive_modules(request: ProjectRequest):
     topic = request.project_topic
     print(f"🔄 Running Adaptive Modules Agent for: {topic}")
-    try:
-        # Prompt construction similar to the example in adaptive_agent.py
-        prompt = f"How to make {topic}"
-        response = await run_agent(adaptive_runner, prompt, timeout=300, target_agent="adaptive_modules_agent")
+    # Prompt construction similar to the example in adaptive_agent.py
+    prompt = f"How to make {topic}"
+
+    async def compute():
+        response = await services.run_agent(services.adaptive_agent, prompt, timeout=300, target_agent="adaptive_modules_agent")
+        if not response:
+            # run_agent logged the failure; don't cache an empty answer
+            raise RuntimeError("Module generation failed")
         clean_response = await structure_beginner_output(str(response))
         return AdaptiveModulesResponse(modules=clean_response)
+
+    try:
+        return await cached_response("/beginner/adaptive", topic, AdaptiveModulesResponse, compute)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/troubleshoot", response_model=QAResponse)
+@router.post("/troubleshoot", response_model=QAResponse, dependencies=AGENT_DEPS)
 async def run_troubleshoot(request: QARequest):
-    user_query = request.query
-    context = ""
-    if request.project_topic:
-        context = f"Context Project: {request.project_topic}. "
-    
-    full_prompt = f"{context}User Query: {user_query}"
-    
     try:
-        response = await run_agent_with_retry(qa_runner, full_prompt)
-        clean_response = format_output(str(response))
-        if not clean_response.strip():
-            clean_response = str(response)
-        return QAResponse(response=clean_response)
+        with usage_scope("/troubleshoot", request.project_topic):
+            response = await services.run_agent_with_retry(services.qa_agent, troubleshoot_prompt(request))
+        return troubleshoot_response(response)
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# --- Streaming endpoints (Server-Sent Events) ---
+# Same agents and final payloads as above, but text is forwarded as
+# `delta` frames while the agents generate; the last frame is `done`
+# with the usual response body (or `error`, with status 429 when the
+# token budget ran out). Cached topics get the `done` frame straight away.
+# Identical concurrent requests (endpoint + topic) share one run: the
+# first one produces the frames, later ones replay and follow them.
+
+def coalesced(endpoint: str, topic: str, produce):
+    return in_flight.stream((f"{endpoint}/stream", services.normalize_text(topic)), produce)
+
+@router.post("/main-agent/stream", dependencies=AGENT_DEPS)
+async def stream_main_agent(request: ProjectRequest):
+    topic = request.project_topic
+    print(f"📋 Streaming Main Agent (Description + Wiring) for: {topic}")
+
+    async def produce():
+        hit = await services.response_cache.get("/main-agent", topic)
+        if hit is not None:
+            yield "done", hit
+            return
+        texts = {}
+        merged = services.merge_streams(
+            services.stream_agent(services.desc_agent, desc_prompt(topic)),
+            services.stream_agent(services.wiring_agent, wiring_prompt(topic)),
+        )
+        with usage_scope("/main-agent", topic):
+            async for frame in collect_deltas(merged, texts):
+                yield frame
+        response = await main_agent_response(
+            texts.get(services.desc_agent.name, ""), texts.get(services.wiring_agent.name, "")
+        )
+        await store_response("/main-agent", topic, response)
+        yield "done", response.model_dump()
+
+    return services.sse_response(coalesced("/main-agent", topic, produce))
+
+@router.post("/code-agent/stream", dependencies=AGENT_DEPS)
+async def stream_code_agent(request: ProjectRequest):
+    topic = request.project_topic
+
+    async def produce():
+        hit = await services.response_cache.get("/code-agent", topic)
+        if hit is not None:
+            yield "done", hit
+            return
+        texts = {}
+        with usage_scope("/code-agent", topic):
+            async for frame in collect_deltas(services.stream_agent(services.code_agent, code_prompt(topic)), texts):
+                yield frame
+        response = await code_agent_response("".join(texts.values()))
+        await store_response("/code-agent", topic, response)
+        yield "done", response.model_dump()
+
+    async def frames():
+        # the sketch is stored per request, under this client's session
+        async for event, data in coalesced("/code-agent", topic, produce):
+            if event == "done":
+                data = save_sketch(CodeAgentResponse(**data), request.session_id).model_dump()
+            yield event, data
+
+    return services.sse_response(frames())
+
+@router.post("/beginner/basics/stream", dependencies=AGENT_DEPS)
+async def stream_basic_modules(request: ProjectRequest):
+    topic = request.project_topic
+    print(f"📚 Streaming Basic Modules Agent for: {topic if topic else 'General'}")
+
+    async def produce():
+        hit = await services.response_cache.get("/beginner/basics", topic)
+        if hit is not None:
+            yield "done", hit
+            return
+        texts = {}
+        stream = services.stream_agent(services.basic_agent, basics_prompt(topic), timeout=300)
+        with usage_scope("/beginner/basics", topic):
+            async for frame in collect_deltas(stream, texts, target_agent="initial_modules_agent"):
+                yield frame
+        clean_response = await structure_beginner_output("".join(texts.values()))
+        response = BasicModulesResponse(modules=clean_response)
+        await store_response("/beginner/basics", topic, response)
+        yield "done", response.model_dump()
+
+    return services.sse_response(coalesced("/beginner/basics", topic, produce))
+
+@router.post("/beginner/adaptive/stream", dependencies=AGENT_DEPS)
+async def stream_adaptive_modules(request: ProjectRequest):
+    topic = request.project_topic
+    print(f"🔄 Streaming Adaptive Modules Agent for: {topic}")
+
+    async def produce():
+        hit = await services.response_cache.get("/beginner/adaptive", topic)
+        if hit is not None:
+            yield "done", hit
+            return
+        texts = {}
+        stream = services.stream_agent(services.adaptive_agent, f"How to make {topic}", timeout=300)
+        with usage_scope("/beginner/adaptive", topic):
+            async for frame in collect_deltas(stream, texts, target_agent="adaptive_modules_agent"):
+                yield frame
+        clean_response = await structure_beginner_output("".join(texts.values()))
+        response = AdaptiveModulesResponse(modules=clean_response)
+        await store_response("/beginner/adaptive", topic, response)
+        yield "done", response.model_dump()
+
+    return services.sse_response(coalesced("/beginner/adaptive", topic, produce))
+
+@router.post("/troubleshoot/stream", dependencies=AGENT_DEPS)
+async def stream_troubleshoot(request: QARequest):
+    async def frames():
+        texts = {}
+        with usage_scope("/troubleshoot", request.project_topic):
+            async for frame in collect_deltas(services.stream_agent(services.qa_agent, troubleshoot_prompt(request)), texts):
+                yield frame
+        yield "done", troubleshoot_response("".join(texts.values())).model_dump()
+
+    return services.sse_response(frames())
+
+# --- Health ---
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving (nothing is loaded for it).
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """
+    Readiness: 503 until the startup warm-up has loaded the agents,
+    their runners and the indexes (see app.api.deps).
+    """
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+# --- Cache metrics ---
+
+@router.get("/cache/stats", dependencies=AGENT_DEPS)
+async def cache_stats():
+    return {
+        "responses": services.response_cache.stats(),
+        "stages": services.stage_cache.stats(),
+        "embeddings": services.embedding_cache_stats(),
+        "singleflight": in_flight.stats(),
+    }
+
+@router.get("/usage")
+async def usage_stats():
+    """
+    Token usage and estimated cost per endpoint, agent and topic since
+    startup, with the configured per-endpoint budgets.
+    """
+    return {**ledger.summary(), "budgets": ROUTE_TOKEN_BUDGETS}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: per-route, agent, model, tool and arduino-cli
+    latency histograms and outcomes, token counts, plus cache gauges.
+    """
+    gauges = {"services": services.stats()}
+    # never waits for the warm-up: lazily loaded parts report once loaded
+    if services.loaded:
+        gauges.update({
+            "response_cache": services.response_cache.stats(),
+            "stage_cache": services.stage_cache.stats(),
+            "embedding_cache": services.embedding_cache_stats(),
+            "runner_pool": services.runner_pool.stats(),
+        })
+    gauges.update({"singleflight": in_flight.stats(), "compiler": compiler.stats()})
+    return PlainTextResponse(registry.render(gauges=gauges), media_type="text/plain; version=0.0.4")
     
 
 # ---------- Arduino Compile ----------
 @router.post("/arduino/compile")
-def compile_arduino(req: CompileRequest):
-    global LAST_PROJECT_FILE
-    # TODO: Current implementation lacks a mechanism to set LAST_PROJECT_FILE. 
-    # This endpoint will fail until that logic is connected to code generation.
-    if not LAST_PROJECT_FILE or not os.path.exists(LAST_PROJECT_FILE):
-        raise HTTPException(status_code=400, detail="No project file available. Run /ask first (or ensure code generation sets this).")
-
-    sketch_dir = os.path.dirname(LAST_PROJECT_FILE)
-    build_dir = os.path.join(sketch_dir, "build")
-    os.makedirs(build_dir, exist_ok=True)
-
+async def compile_arduino(req: CompileRequest):
     try:
-        result = subprocess.run(
-            [
-                "arduino-cli", "compile",
-                "--fqbn", req.fqbn,
-                "--output-dir", build_dir,
-                sketch_dir
-            ],
-            capture_output=True, text=True, check=True
-        )
-        return {"success": True, "message": result.stdout}
+        sketch_dir = sketch_store.resolve(req.sketch_id, req.session_id, req.code)
+        build = await compiler.compile(sketch_dir, req.fqbn)
+        return {"success": True, "message": build.output, "cached": build.cached}
 
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=400, detail=e.stderr)
+    except SketchNotFound as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CompileError as e:
+        raise HTTPException(status_code=400, detail=e.output)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ---------- Arduino Flash ----------
 @router.post("/arduino/flash")
-def flash_code(req: FlashRequest):
-    global LAST_PROJECT_FILE
-    if not LAST_PROJECT_FILE or not os.path.exists(LAST_PROJECT_FILE):
-        raise HTTPException(status_code=400, detail="No project file available. Run /ask first.")
-
-    sketch_dir = os.path.dirname(LAST_PROJECT_FILE)
-    build_dir = os.path.join(sketch_dir, "build")
-
+async def flash_code(req: FlashRequest):
     try:
-        # Re-compile to ensure it's fresh
-        subprocess.run(
-            ["arduino-cli", "compile", "--fqbn", req.fqbn, "--output-dir", build_dir, sketch_dir],
-            check=True, capture_output=True, text=True
-        )
-
-        # Upload using the compiled output
-        result = subprocess.run(
-            ["arduino-cli", "upload", "-p", req.port, "--fqbn", req.fqbn, "--input-dir", build_dir, sketch_dir],
-            check=True, capture_output=True, text=True
-        )
-        return {"success": True, "message": result.stdout}
+        sketch_dir = sketch_store.resolve(req.sketch_id, req.session_id, req.code)
+        # Compiles only if this sketch/FQBN has no build yet, then uploads it
+        output = await compiler.upload(sketch_dir, req.fqbn, req.port)
+        return {"success": True, "message": output}
 
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=400, detail=e.stderr)
+    except SketchNotFound as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CompileError as e:
+        raise HTTPException(status_code=400, detail=e.output)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ---------- Arduino Boards ----------
 @router.get("/arduino/boards")
-def list_boards():
-    """List connected Arduino boards with robust error handling."""
-    try:
-        command = ["arduino-cli", "board", "list", "--format", "json"]
-        result = subprocess.run(
-            command, 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-
-        if not result.stdout.strip():
-            return {"boards": [], "message": "No connected boards found."}
+async def list_boards():
+    """List connected Arduino boards from the background watcher's snapshot."""
+    snapshot = await board_watcher.snapshot()
+    if snapshot["error"]:
+        raise HTTPException(status_code=500, detail=snapshot["error"])
+    return snapshot["boards"]
 
-        return json.loads(result.stdout)
 
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=500, 
-            detail="'arduino-cli' not found. Please ensure it is installed and in your system's PATH."
-        )
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"An error occurred with arduino-cli. Return code: {e.returncode}. Stderr: {e.stderr}. Stdout: {e.stdout}"
-        )
-    except json.JSONDecodeError:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Failed to parse JSON from arduino-cli. Raw output: {result.stdout}"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"An unexpected error occurred: {str(e)}"
-        )
+@router.get("/arduino/boards/changes")
+async def board_changes(since: int = 0, timeout: float = 25.0):
+    """
+    Long-poll for board changes: returns as soon as the board list version
+    is newer than `since` (or after `timeout` seconds with the current one).
+    Pass the returned `version` as `since` in the next call.
+    """
+    snapshot = await board_watcher.wait_for_change(since, min(max(timeout, 0.0), 60.0))
+    return {"version": snapshot["version"], "boards": snapshot["boards"], "error": snapshot["error"]}
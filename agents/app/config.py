@@ -5,6 +5,29 @@ This module provides optimized generation configurations for different
 use cases: balanced, creative, and factual content generation.
 """
 
+import os
+import json
+
+# Version of the agent prompts/configs. Cached endpoint responses are
+# scoped to it, so bump it whenever instructions or models change.
+AGENT_CONFIG_VERSION = os.getenv("AGENT_CONFIG_VERSION", "1")
+
+# Token budgets per endpoint (the /stream variants share them), enforced
+# by the model wrapper (see app.core.usage):
+# - max_output_tokens caps each model call made while serving a request
+# - max_request_tokens rejects further model calls once the request has
+#   used that many tokens (prompt + output) in total
+# A JSON object in the ROUTE_TOKEN_BUDGETS env var overrides entries.
+ROUTE_TOKEN_BUDGETS = {
+    "/project-name":      {"max_output_tokens": 256,  "max_request_tokens": 20000},  # name_agent doesn't think
+    "/main-agent":        {"max_output_tokens": 4096, "max_request_tokens": 120000},
+    "/code-agent":        {"max_output_tokens": 8192, "max_request_tokens": 120000},
+    "/beginner/basics":   {"max_output_tokens": 8192, "max_request_tokens": 250000},
+    "/beginner/adaptive": {"max_output_tokens": 4096, "max_request_tokens": 250000},  # per module call
+    "/troubleshoot":      {"max_output_tokens": 2048, "max_request_tokens": 60000},
+}
+ROUTE_TOKEN_BUDGETS.update(json.loads(os.getenv("ROUTE_TOKEN_BUDGETS", "{}")))
+
 # Balanced configuration for educational content
 # Balances creativity (engaging examples) with reliability (technical accuracy)
 GENERATION_CONFIG = {
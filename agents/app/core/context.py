@@ -0,0 +1,130 @@
+import os
+import re
+from typing import List, Set, Tuple
+
+from langchain_core.documents import Document
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# token budget for the context_string handed to the LLM
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "2500"))
+
+# chunks from the same url/section sharing this much text are duplicates
+OVERLAP_THRESHOLD = 0.6
+
+# don't bother trimming a chunk into less room than this
+MIN_TRIM_TOKENS = 64
+
+CHARS_PER_TOKEN = 4
+_WORD_RE = re.compile(r"\w+")
+
+Scored = Tuple[Document, float]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, model-agnostic token estimate (~4 characters per token).
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _header(doc: Document) -> str:
+    meta = doc.metadata or {}
+    return f"{meta.get('title', 'unknown')} {meta.get('section', '')} {meta.get('url', '')}"
+
+
+def block_tokens(doc: Document) -> int:
+    """
+    Tokens one formatted result block costs (header + content).
+    """
+    return estimate_tokens(_header(doc)) + estimate_tokens(doc.page_content) + 8
+
+
+def _shingles(text: str, n: int = 5) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _overlaps(a: Set, b: Set) -> bool:
+    if not a or not b:
+        return False
+    # containment of the smaller chunk in the larger one
+    return len(a & b) / min(len(a), len(b)) >= OVERLAP_THRESHOLD
+
+
+def dedupe(candidates: List[Scored]) -> List[Scored]:
+    """
+    Drop chunks that repeat a better-ranked chunk from the same url/section.
+    """
+    kept: List[Scored] = []
+    seen = {}
+    for doc, score in candidates:
+        meta = doc.metadata or {}
+        key = (meta.get("url"), meta.get("section"))
+        shingles = _shingles(doc.page_content)
+        if any(_overlaps(shingles, other) for other in seen.get(key, [])):
+            continue
+        seen.setdefault(key, []).append(shingles)
+        kept.append((doc, score))
+    return kept
+
+
+def _trim(doc: Document, tokens: int) -> Document:
+    limit = max(tokens - estimate_tokens(_header(doc)) - 8, 0) * CHARS_PER_TOKEN
+    text = doc.page_content[:limit]
+    cut = text.rfind(" ")
+    if cut > limit // 2:
+        text = text[:cut]
+    return doc.model_copy(update={"page_content": text.rstrip() + " …"})
+
+
+# ============================================================
+# PACKER
+# ============================================================
+
+def pack_context(
+    candidates: List[Scored],
+    budget: int = CONTEXT_TOKEN_BUDGET
+) -> Tuple[List[Scored], int]:
+    """
+    Fit ranked (doc, score) candidates (higher score is better) into a
+    token budget.
+
+    Duplicates are removed first; if the rest doesn't fit, chunks are
+    chosen by score density (score per token) and the best leftover is
+    trimmed into the remaining room. The output keeps rank order.
+    Returns the packed candidates and the tokens they use.
+    """
+    candidates = dedupe(candidates)
+    costs = [block_tokens(doc) for doc, _ in candidates]
+
+    if sum(costs) <= budget:
+        return candidates, sum(costs)
+
+    by_density = sorted(
+        range(len(candidates)),
+        key=lambda i: -candidates[i][1] / max(costs[i], 1)
+    )
+
+    chosen = {}
+    used = 0
+    for i in by_density:
+        if used + costs[i] <= budget:
+            chosen[i] = candidates[i]
+            used += costs[i]
+
+    room = budget - used
+    if room >= MIN_TRIM_TOKENS:
+        for i in by_density:
+            if i not in chosen:
+                doc, score = candidates[i]
+                trimmed = _trim(doc, room)
+                chosen[i] = (trimmed, score)
+                used += block_tokens(trimmed)
+                break
+
+    return [chosen[i] for i in sorted(chosen)], used
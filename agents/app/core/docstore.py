@@ -0,0 +1,316 @@
+"""
+Columnar document store for the FAISS indexes.
+
+Layout inside an index directory (row i == FAISS row i):
+
+    docs.bin            page_content of every row, utf-8, concatenated
+    docs.offsets.npy    int64[n + 1] byte offsets into docs.bin
+    docs.<column>.npy   int32[n] dictionary codes per metadata column
+    docs.meta.json      row ids and the dictionary of each column
+
+Everything is memory-mapped, so opening a store is O(1) and only the
+rows a search returns are ever decoded.
+
+Build from a LangChain pickle:
+
+    python -m app.core.docstore app/core/faiss_content app/core/faiss_code
+"""
+
+import os
+import sys
+import json
+import mmap
+import pickle
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger("ColumnarDocstore")
+
+BLOB_FILE = "docs.bin"
+OFFSETS_FILE = "docs.offsets.npy"
+META_FILE = "docs.meta.json"
+PICKLE_FILE = "index.pkl"
+FORMAT_VERSION = 1
+
+Row = Tuple[str, str, Dict]  # (docstore id, page_content, metadata)
+
+
+def _column_file(column: str) -> str:
+    return f"docs.{column}.npy"
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """
+    np.save via a temp file + rename, so live memory maps of the old
+    file are never truncated under a reader.
+    """
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+def exists(path: str) -> bool:
+    return os.path.exists(os.path.join(path, META_FILE))
+
+
+# ============================================================
+# READER
+# ============================================================
+
+class ColumnarDocstore:
+    """
+    Read-only, memory-mapped view over a columnar store directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported docstore version in {path}: {meta.get('version')}")
+
+        self.ids: List[str] = meta["ids"]
+        self.dictionaries: Dict[str, List[str]] = meta["columns"]
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self.codes = {
+            column: np.load(os.path.join(path, _column_file(column)), mmap_mode="r")
+            for column in self.dictionaries
+        }
+
+        self._rows_by_code: Dict[str, Dict[int, np.ndarray]] = {}
+
+        self._file = open(os.path.join(path, BLOB_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def metadata(self, row: int) -> Dict:
+        meta = {}
+        for column, values in self.dictionaries.items():
+            code = int(self.codes[column][row])
+            if code >= 0:
+                meta[column] = values[code]
+        return meta
+
+    def get(self, row: int) -> Document:
+        return Document(
+            id=self.ids[row],
+            page_content=self.text(row),
+            metadata=self.metadata(row),
+        )
+
+    def get_many(self, rows: Iterable[int]) -> List[Document]:
+        return [self.get(row) for row in rows]
+
+    def rows_by_code(self, column: str) -> Dict[int, np.ndarray]:
+        """
+        Row ids per dictionary code of a column, computed once per column.
+        """
+        if column not in self._rows_by_code:
+            codes = np.asarray(self.codes.get(column, np.empty(0, dtype=np.int32)))
+            order = np.argsort(codes, kind="stable")
+            values, starts = np.unique(codes[order], return_index=True)
+            groups = np.split(order, starts[1:])
+            self._rows_by_code[column] = {
+                int(code): rows for code, rows in zip(values, groups) if code >= 0
+            }
+        return self._rows_by_code[column]
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+
+# ============================================================
+# WRITER
+# ============================================================
+
+def write_columnar(path: str, rows: Iterable[Row]) -> int:
+    """
+    Write rows (in FAISS order) as a columnar store. Returns the row count.
+    """
+    ids: List[str] = []
+    offsets = [0]
+    raw_columns: Dict[str, List[Optional[str]]] = {}
+
+    tmp_blob = os.path.join(path, BLOB_FILE + ".tmp")
+    with open(tmp_blob, "wb") as blob:
+        for n, (doc_id, text, meta) in enumerate(rows):
+            data = text.encode("utf-8")
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+            ids.append(doc_id)
+
+            for column in meta:
+                raw_columns.setdefault(column, [None] * n)
+            for column, values in raw_columns.items():
+                value = meta.get(column)
+                values.append(None if value is None else str(value))
+
+    dictionaries: Dict[str, List[str]] = {}
+    for column, values in raw_columns.items():
+        lookup: Dict[str, int] = {}
+        codes = np.full(len(values), -1, dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is not None:
+                codes[i] = lookup.setdefault(value, len(lookup))
+        dictionaries[column] = list(lookup)
+        save_array(os.path.join(path, _column_file(column)), codes)
+
+    save_array(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    os.replace(tmp_blob, os.path.join(path, BLOB_FILE))
+
+    # meta last: its presence marks the store as complete
+    tmp_meta = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump({"version": FORMAT_VERSION, "ids": ids, "columns": dictionaries}, f)
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+    return len(ids)
+
+
+def append_columnar(path: str, rows: Iterable[Row]) -> Tuple[int, int]:
+    """
+    Append rows to an existing columnar store. Returns (first new row,
+    row count after the append). Readers that already mapped the store
+    keep seeing the old version until they reopen it.
+
+    The metadata file is written last, so its ids are the committed rows;
+    anything an interrupted earlier append left past them (offsets, codes,
+    bytes in docs.bin) is discarded first.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+
+    ids: List[str] = meta["ids"]
+    dictionaries: Dict[str, List[str]] = meta["columns"]
+    offsets = np.load(os.path.join(path, OFFSETS_FILE)).tolist()
+    codes = {
+        column: np.load(os.path.join(path, _column_file(column))).tolist()
+        for column in dictionaries
+    }
+    lookups = {column: {v: i for i, v in enumerate(values)} for column, values in dictionaries.items()}
+    first = len(ids)
+
+    offsets = offsets[:first + 1]
+    codes = {column: column_codes[:first] for column, column_codes in codes.items()}
+    blob_path = os.path.join(path, BLOB_FILE)
+    size = os.path.getsize(blob_path)
+    if len(offsets) != first + 1 or size < offsets[-1]:
+        raise ValueError(f"Columnar store in {path} is corrupt: offsets don't cover its {first} rows")
+    if size > offsets[-1]:
+        logger.warning(f"Dropping {size - offsets[-1]} uncommitted bytes from {blob_path}")
+        os.truncate(blob_path, offsets[-1])
+
+    with open(blob_path, "ab") as blob:
+        for doc_id, text, row_meta in rows:
+            data = text.encode("utf-8")
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+            n = len(ids)
+            ids.append(doc_id)
+
+            for column in row_meta:
+                if column not in codes:
+                    codes[column] = [-1] * n
+                    lookups[column] = {}
+                    dictionaries[column] = []
+            for column, column_codes in codes.items():
+                value = row_meta.get(column)
+                if value is None:
+                    column_codes.append(-1)
+                    continue
+                value = str(value)
+                if value not in lookups[column]:
+                    lookups[column][value] = len(dictionaries[column])
+                    dictionaries[column].append(value)
+                column_codes.append(lookups[column][value])
+
+    for column, column_codes in codes.items():
+        save_array(os.path.join(path, _column_file(column)), np.asarray(column_codes, dtype=np.int32))
+    save_array(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+    tmp_meta = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump({"version": FORMAT_VERSION, "ids": ids, "columns": dictionaries}, f)
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+    return first, len(ids)
+
+
+# ============================================================
+# PICKLE CONVERSION
+# ============================================================
+
+class _Stub:
+    """
+    Inert stand-in for the LangChain classes inside index.pkl.
+    """
+
+    def __setstate__(self, state):
+        self.state = state
+
+
+class _DocstoreUnpickler(pickle.Unpickler):
+    """
+    Only resolves the LangChain docstore/document classes (as stubs), so
+    the conversion neither needs LangChain nor executes arbitrary code.
+    """
+
+    ALLOWED = {
+        ("langchain_community.docstore.in_memory", "InMemoryDocstore"),
+        ("langchain_core.documents.base", "Document"),
+        ("langchain.schema.document", "Document"),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED:
+            return _Stub
+        raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from docstore pickle")
+
+
+def _fields(obj) -> Dict:
+    state = obj.state
+    if isinstance(state, tuple):  # (state, slotstate)
+        state = state[0] or state[1]
+    return state.get("__dict__", state)
+
+
+def read_pickle_rows(path: str) -> List[Row]:
+    """
+    Read rows in FAISS order from a LangChain `index.pkl`.
+    """
+    with open(os.path.join(path, PICKLE_FILE), "rb") as f:
+        docstore, index_to_id = _DocstoreUnpickler(f).load()
+
+    documents = _fields(docstore)["_dict"]
+    rows = []
+    for i in range(len(index_to_id)):
+        doc_id = index_to_id[i]
+        doc = _fields(documents[doc_id])
+        rows.append((doc_id, doc["page_content"], doc.get("metadata") or {}))
+    return rows
+
+
+def convert_pickle(path: str) -> int:
+    """
+    Build the columnar store next to an existing `index.pkl`.
+    """
+    count = write_columnar(path, read_pickle_rows(path))
+    logger.info(f"Wrote columnar docstore for {path} ({count} rows)")
+    return count
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for store_path in sys.argv[1:]:
+        convert_pickle(store_path)
@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("EmbeddingCache")
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, "cache", "embeddings.sqlite3")
+
+LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096"))
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a query for cache lookups.
+    Collapses whitespace and casing so near-identical tool calls share a key.
+    """
+    return " ".join(text.split()).lower()
+
+
+def cache_key(model: str, text: str) -> str:
+    """
+    Content address of an embedding: model name + normalized text.
+    """
+    payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+# ============================================================
+# STORAGE TIERS
+# ============================================================
+
+class _SqliteTier:
+    """
+    Persistent key -> float32 blob table shared by every worker on the host.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                keys,
+            ).fetchall()
+        return {key: _unpack(blob) for key, blob in rows}
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, _pack(vector)) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+
+class _LruTier:
+    """
+    Small in-process LRU in front of the persistent tier.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is not None:
+                self._data.move_to_end(key)
+            return vector
+
+    def put(self, key: str, vector: List[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = vector
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ============================================================
+# CACHED EMBEDDINGS
+# ============================================================
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed embedding cache in front of a LangChain embedder.
+
+    Lookups go LRU -> SQLite -> upstream. The upstream embedder is built
+    lazily so fully cached queries never need an embedding API key.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Embeddings],
+        model: str,
+        path: Optional[str] = CACHE_PATH,
+        lru_size: int = LRU_SIZE,
+    ):
+        self.model = model
+        self._factory = factory
+        self._upstream: Optional[Embeddings] = None
+        self._lru = _LruTier(lru_size)
+        self._disk = _SqliteTier(path) if path else None
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def upstream(self) -> Embeddings:
+        if self._upstream is None:
+            self._upstream = self._factory()
+        return self._upstream
+
+    # ---------- lookup helpers ----------
+
+    def _count(self, hits: int = 0, disk_hits: int = 0, misses: int = 0) -> None:
+        with self._stats_lock:
+            self.hits += hits
+            self.disk_hits += disk_hits
+            self.misses += misses
+
+    def _memory(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for key in keys:
+            vector = self._lru.get(key)
+            if vector is not None:
+                found[key] = vector
+        self._count(hits=len(found))
+        return found
+
+    def _from_disk(self, disk: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        for key, vector in disk.items():
+            self._lru.put(key, vector)
+        self._count(disk_hits=len(disk))
+        return disk
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = self._memory(keys)
+        remaining = [key for key in keys if key not in found]
+        if remaining and self._disk:
+            found.update(self._from_disk(self._disk.get_many(remaining)))
+        return found
+
+    async def _alookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        # SQLite reads go to a worker thread, off the event loop
+        found = self._memory(keys)
+        remaining = [key for key in keys if key not in found]
+        if remaining and self._disk:
+            found.update(self._from_disk(await asyncio.to_thread(self._disk.get_many, remaining)))
+        return found
+
+    def _persist(self, items: Dict[str, List[float]]) -> None:
+        try:
+            self._disk.put_many(items)
+        except sqlite3.Error:
+            logger.exception("Failed to persist embeddings")
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        for key, vector in items.items():
+            self._lru.put(key, vector)
+        if self._disk:
+            self._persist(items)
+
+    async def _astore(self, items: Dict[str, List[float]]) -> None:
+        for key, vector in items.items():
+            self._lru.put(key, vector)
+        if self._disk:
+            await asyncio.to_thread(self._persist, items)
+
+    def _keys(self, texts: List[str]) -> List[str]:
+        return [cache_key(self.model, text) for text in texts]
+
+    def _missing(self, keys: List[str], texts: List[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        # one upstream input per distinct missing key; only the key is
+        # normalized, the embedder gets the original text (the prebuilt
+        # indexes were embedded verbatim)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self._count(misses=len(missing))
+        return missing
+
+    # ---------- Embeddings interface ----------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = self._lookup(list(dict.fromkeys(keys)))
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = self.upstream.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = await self._alookup(list(dict.fromkeys(keys)))
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = await self.upstream.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            await self._astore(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    # ---------- metrics ----------
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model": self.model,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "lru_entries": len(self._lru),
+            }
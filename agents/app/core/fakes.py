@@ -0,0 +1,221 @@
+"""
+Deterministic offline stand-ins for Gemini and the OpenAI embeddings.
+
+    FAKE_LLM=1          agents get FakeLlm (see app.core.llm.gemini_model)
+    FAKE_EMBEDDINGS=1   the retriever and caches embed with FakeEmbeddings
+
+Both derive their output from a hash of the input, so runs are
+repeatable and need no network or API keys. FakeLlm simulates the
+latency profile of a real model: time to first token, a token rate
+(streamed in chunks when the runner asks for SSE), an optional
+retrieval tool call per request and injected 429s. That makes
+benchmarks (see benchmarks/) exercise the same runner, rate limiter,
+tool and cache paths as production.
+"""
+
+import os
+import random
+import asyncio
+import hashlib
+import logging
+from typing import AsyncGenerator, List, Optional
+
+import numpy as np
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from google.genai.errors import ClientError
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("Fakes")
+
+
+def _flag(name: str, default: str = "") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+FAKE_LLM = _flag("FAKE_LLM")
+FAKE_EMBEDDINGS = _flag("FAKE_EMBEDDINGS")
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.4"))            # seconds to first token
+FAKE_LLM_TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "200"))
+FAKE_LLM_OUTPUT_TOKENS = int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "300"))
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0"))            # per attempt
+FAKE_LLM_TOOL_CALLS = _flag("FAKE_LLM_TOOL_CALLS", "1")                  # one retrieval call per request
+
+FAKE_EMBED_DIM = int(os.getenv("FAKE_EMBED_DIM", "1536"))   # text-embedding-3-small
+FAKE_EMBED_LATENCY = float(os.getenv("FAKE_EMBED_LATENCY", "0"))
+
+STREAM_CHUNK_TOKENS = 8
+
+_WORDS = (
+    "sensor pin voltage current signal timing interrupt register pulse serial "
+    "ground resistor threshold sample buffer clock module board wiring power "
+    "digital analog loop setup delay millis servo motor display library"
+).split()
+
+
+def _seed(*parts: str) -> int:
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    texts = []
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                texts.append(part.text)
+    return "\n".join(texts)
+
+
+def _has_tool_result(llm_request: LlmRequest) -> bool:
+    return any(
+        part.function_response is not None
+        for content in llm_request.contents or []
+        for part in content.parts or []
+    )
+
+
+def _system_text(llm_request: LlmRequest) -> str:
+    instruction = getattr(llm_request.config, "system_instruction", None)
+    return instruction if isinstance(instruction, str) else str(instruction or "")
+
+
+class FakeLlm(BaseLlm):
+    """
+    Offline ADK model with a configurable latency profile.
+
+    Replies are lorem text built from the hash of the request, or a
+    {"modules": [...]} JSON document when the instruction asks for JSON,
+    so the pipelines that parse model output keep working.
+    """
+
+    latency: float = FAKE_LLM_LATENCY
+    tokens_per_sec: float = FAKE_LLM_TOKENS_PER_SEC
+    output_tokens: int = FAKE_LLM_OUTPUT_TOKENS
+    error_rate: float = FAKE_LLM_429_RATE
+    tool_calls: bool = FAKE_LLM_TOOL_CALLS
+
+    def _words(self, rng: random.Random, count: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(max(count, 1)))
+
+    def _reply(self, llm_request: LlmRequest, rng: random.Random) -> str:
+        # sized to the request's max_output_tokens, like a truncated reply
+        limit = getattr(llm_request.config, "max_output_tokens", None)
+        output_tokens = min(self.output_tokens, limit) if limit else self.output_tokens
+        if "json" not in _system_text(llm_request).lower():
+            return self._words(rng, output_tokens)
+        per_module = max(output_tokens // 4, 1)
+        modules = [
+            f'{{"title": "Module {i + 1}: {self._words(rng, 3)}", '
+            f'"subtitle": "{self._words(rng, 6)}", '
+            f'"content": "{self._words(rng, per_module)}", "resources": []}}'
+            for i in range(4)
+        ]
+        return '{"modules": [' + ", ".join(modules) + "]}"
+
+    def _tool_call(self, llm_request: LlmRequest, text: str) -> Optional[types.Part]:
+        if not self.tool_calls or _has_tool_result(llm_request) or not llm_request.tools_dict:
+            return None
+        name = sorted(llm_request.tools_dict)[0]
+        query = " ".join(text.split()[-12:])
+        args = {"queries": [query]} if name.endswith("_batch") else {"query": query}
+        return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+    def _maybe_429(self) -> None:
+        # independent per attempt, unlike the content (seeded by the prompt)
+        if self.error_rate and random.random() < self.error_rate:
+            raise ClientError(429, {"error": {
+                "code": 429,
+                "message": "Resource has been exhausted (fake).",
+                "status": "RESOURCE_EXHAUSTED",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "1s"}],
+            }})
+
+    async def _attempt(self) -> None:
+        """
+        Time to first token, then maybe an injected 429 (retried above the
+        limiter by app.core.llm, like real ones).
+        """
+        await asyncio.sleep(self.latency)
+        self._maybe_429()
+
+    def _usage(self, prompt: str, output: str) -> types.GenerateContentResponseUsageMetadata:
+        prompt_tokens, output_tokens = len(prompt.split()), len(output.split())
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    async def generate_content_async(
+        self,
+        llm_request: LlmRequest,
+        stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt = _system_text(llm_request) + "\n" + _request_text(llm_request)
+        rng = random.Random(_seed(self.model, prompt, str(_has_tool_result(llm_request))))
+        await self._attempt()
+
+        call = self._tool_call(llm_request, _request_text(llm_request))
+        if call is not None:
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[call]),
+                usage_metadata=self._usage(prompt, ""),
+                model_version=self.model,
+            )
+            return
+
+        text = self._reply(llm_request, rng)
+        words = text.split(" ")
+        if stream:
+            for start in range(0, len(words), STREAM_CHUNK_TOKENS):
+                chunk = words[start:start + STREAM_CHUNK_TOKENS]
+                await asyncio.sleep(len(chunk) / self.tokens_per_sec)
+                delta = " ".join(chunk) + (" " if start + STREAM_CHUNK_TOKENS < len(words) else "")
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=delta)]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(len(words) / self.tokens_per_sec)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=self._usage(prompt, text),
+            model_version=self.model,
+            partial=False,
+            turn_complete=True,
+        )
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hash-seeded unit vectors: the same text always gets the same vector.
+    Has the dimension of the shipped indexes, so FAISS searches run for
+    real (the neighbours just aren't semantically meaningful).
+    """
+
+    def __init__(self, dim: int = FAKE_EMBED_DIM, latency: float = FAKE_EMBED_LATENCY):
+        self.dim = dim
+        self.latency = latency
+
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(_seed(" ".join(text.split()).lower()))
+        vector = rng.standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,228 @@
+"""
+Build approximate variants of the FAISS stores and benchmark them
+against the exact (flat) index.
+
+Variants are written next to the flat index as `index.<variant>.faiss`
+and share its row ids, so the docstore and sparse index are reused as is.
+The retriever picks one with FAISS_INDEX_VARIANT (flat | hnsw | ivfpq).
+
+    python -m app.core.index_builder build app/core/faiss_content --variant hnsw --hnsw-m 32
+    python -m app.core.index_builder build app/core/faiss_code --variant ivfpq --nlist 64 --pq-m 32 --nprobe 8
+    python -m app.core.index_builder bench app/core/faiss_content --variant hnsw --ef-search 64
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger("IndexBuilder")
+
+FLAT_INDEX_FILE = "index.faiss"
+VARIANTS = ("flat", "hnsw", "ivfpq")
+
+
+def index_file(variant: str) -> str:
+    return FLAT_INDEX_FILE if variant == "flat" else f"index.{variant}.faiss"
+
+
+def default_nprobe(nlist: int) -> int:
+    """
+    Inverted lists an IVF index probes unless told otherwise: about an
+    eighth of them. FAISS's own default of 1 scans a single list, and
+    recall drops sharply.
+    """
+    return max(1, nlist // 8)
+
+
+def apply_search_params(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None
+) -> None:
+    """
+    Set query-time knobs on whichever index type supports them. Without
+    an explicit `nprobe`, an IVF index keeps the one stored with it.
+    """
+    params = faiss.ParameterSpace()
+    ivf = faiss.try_extract_index_ivf(index)
+    if nprobe and ivf is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    elif ivf is not None and ivf.nprobe == 1 and ivf.nlist > 1:
+        # built before the builder stored an nprobe
+        ivf.nprobe = default_nprobe(ivf.nlist)
+    if ef_search and hasattr(index, "hnsw"):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def _flat_vectors(path: str) -> Tuple[np.ndarray, int]:
+    flat = faiss.read_index(os.path.join(path, FLAT_INDEX_FILE))
+    return flat.reconstruct_n(0, flat.ntotal), flat.metric_type
+
+
+def build_variant(
+    path: str,
+    variant: str,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    nlist: Optional[int] = None,
+    pq_m: int = 32,
+    nbits: int = 8,
+    nprobe: Optional[int] = None,
+) -> str:
+    """
+    Build `variant` from the flat index in `path`. Returns the file written.
+    An IVF index is written with its query-time nprobe (`nprobe`, else
+    default_nprobe(nlist)).
+    """
+    if variant == "flat":
+        raise ValueError("The flat index is the source, nothing to build")
+
+    vectors, metric = _flat_vectors(path)
+    n, dim = vectors.shape
+
+    if variant == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+    elif variant == "ivfpq":
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the vector dimension {dim}")
+        # ~39 training points per centroid keeps k-means stable
+        nlist = nlist or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlat(dim, metric)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, nbits, metric)
+        index.train(vectors)
+        # serialized with the index, so the retriever needn't know it
+        index.nprobe = nprobe or default_nprobe(nlist)
+    else:
+        raise ValueError(f"Unknown index variant '{variant}', expected one of {VARIANTS}")
+
+    index.add(vectors)
+
+    out = os.path.join(path, index_file(variant))
+    faiss.write_index(index, out + ".tmp")
+    os.replace(out + ".tmp", out)
+    logger.info(f"Wrote {out} ({n} vectors, {os.path.getsize(out) / 1e6:.1f} MB)")
+    return out
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+def _percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def benchmark(
+    path: str,
+    variant: str,
+    k: int = 12,
+    num_queries: int = 200,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    noise: float = 0.05,
+    seed: int = 0,
+) -> Dict:
+    """
+    recall@k and per-query latency of `variant` versus the exact index.
+
+    Queries are stored vectors plus gaussian noise, so no embedding API
+    is needed; real query fixtures can be swapped in by the caller.
+    """
+    vectors, _ = _flat_vectors(path)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    scale = noise * float(np.linalg.norm(vectors, axis=1).mean()) / math.sqrt(vectors.shape[1])
+    queries = (vectors[picks] + rng.normal(0, scale, (len(picks), vectors.shape[1]))).astype(np.float32)
+
+    exact = faiss.read_index(os.path.join(path, FLAT_INDEX_FILE))
+    _, truth = exact.search(queries, k)
+
+    index = faiss.read_index(os.path.join(path, index_file(variant)))
+    apply_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = ivf.nprobe
+
+    latencies = []
+    found = np.empty_like(truth)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0]
+
+    start = time.perf_counter()
+    index.search(queries, k)
+    batch_seconds = time.perf_counter() - start
+
+    recall = float(np.mean([
+        len(set(t) & set(f)) / k for t, f in zip(truth, found)
+    ]))
+
+    return {
+        "path": path,
+        "variant": variant,
+        "k": k,
+        "queries": len(queries),
+        "nprobe": nprobe,
+        "ef_search": ef_search,
+        f"recall@{k}": round(recall, 4),
+        "latency_ms_p50": round(_percentile(latencies, 50), 4),
+        "latency_ms_p95": round(_percentile(latencies, 95), 4),
+        "batch_qps": round(len(queries) / batch_seconds, 1) if batch_seconds else None,
+        "index_mb": round(os.path.getsize(os.path.join(path, index_file(variant))) / 1e6, 3),
+        "flat_mb": round(os.path.getsize(os.path.join(path, FLAT_INDEX_FILE)) / 1e6, 3),
+    }
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("paths", nargs="+", help="index directories (e.g. app/core/faiss_content)")
+    parser.add_argument("--variant", choices=VARIANTS, default="hnsw")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=None)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=None)
+    parser.add_argument("--pq-m", type=int, default=32)
+    parser.add_argument("--nbits", type=int, default=8)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        if args.command == "build":
+            build_variant(
+                path, args.variant,
+                hnsw_m=args.hnsw_m, ef_construction=args.ef_construction,
+                nlist=args.nlist, pq_m=args.pq_m, nbits=args.nbits, nprobe=args.nprobe,
+            )
+        else:
+            result = benchmark(
+                path, args.variant, k=args.k, num_queries=args.queries,
+                nprobe=args.nprobe, ef_search=args.ef_search,
+            )
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,340 @@
+"""
+Incremental ingestion into the FAISS stores.
+
+Input is JSONL, one project per line:
+
+    {"title": "Smart Dustbin using Arduino", "url": "https://...",
+     "sections": [{"section": "Circuit Diagram", "text": "...", "code": "..."}]}
+
+Section text goes to faiss_content and code to faiss_code, chunked in the
+same "TITLE/SECTION" layout as the existing corpus. Every store keeps an
+`ingest.manifest.json` of content hashes: unchanged projects and chunks
+are skipped, new chunks are embedded in bounded concurrent batches and
+appended to the index, the columnar docstore and the BM25 index, and
+chunks dropped from an updated project are retired (hidden from search).
+
+    python -m app.core.ingest projects.jsonl --batch-size 64 --concurrency 4
+
+Running servers pick up the new rows after a restart.
+"""
+
+import os
+import sys
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core import docstore as columnar
+from app.core.docstore import ColumnarDocstore, Row
+from app.core.sparse_index import build_sparse
+
+logger = logging.getLogger("Ingest")
+
+MANIFEST_FILE = "ingest.manifest.json"
+
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+BATCH_SIZE = 64
+CONCURRENCY = 4
+WINDOW_CHUNKS = 1024   # chunks buffered before they are flushed to disk
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# CHUNKING
+# ============================================================
+
+def split_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split on paragraph/line boundaries into ~`size` character pieces,
+    carrying `overlap` characters of context into the next piece.
+    """
+    text = text.strip()
+    if len(text) <= size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = max(text.rfind("\n\n", start, end), text.rfind("\n", start, end))
+            if cut > start + size // 2:
+                end = cut
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+
+def project_chunks(project: Dict) -> Dict[str, List[Tuple[str, Dict]]]:
+    """
+    Chunks of one project per store type: {"content": [...], "code": [...]}
+    as (page_content, metadata) pairs.
+    """
+    title = project.get("title", "unknown")
+    url = project.get("url", "")
+    out = {"content": [], "code": []}
+
+    for section in project.get("sections", []):
+        name = section.get("section", "")
+        for piece in split_text(section.get("text") or ""):
+            meta = {"title": title, "section": name, "url": url, "type": "content"}
+            out["content"].append((f"TITLE: {title}\nSECTION: {name}\n{piece}", meta))
+        for piece in split_text(section.get("code") or ""):
+            meta = {"title": title, "section": name, "url": url, "type": "code"}
+            out["code"].append((f"PROJECT: {title}\nSECTION: {name}\nCODE:\n{piece}", meta))
+
+    return out
+
+
+def read_projects(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ============================================================
+# MANIFEST
+# ============================================================
+
+class Manifest:
+    """
+    Content hashes of one store: project -> (hash, chunk hashes) and
+    chunk hash -> row. Seeded from the docstore on first use so the
+    original corpus is deduplicated against too.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(self.file):
+            with open(self.file) as f:
+                data = json.load(f)
+        else:
+            data = self._seed()
+        self.documents: Dict[str, Dict] = data["documents"]
+        self.chunks: Dict[str, int] = data["chunks"]
+        self.retired: List[int] = data["retired"]
+
+    def _seed(self) -> Dict:
+        docstore = ColumnarDocstore(self.path)
+        documents: Dict[str, Dict] = {}
+        chunks: Dict[str, int] = {}
+        for row in range(len(docstore)):
+            h = _hash(docstore.text(row))
+            chunks.setdefault(h, row)
+            url = docstore.metadata(row).get("url", "")
+            documents.setdefault(url, {"hash": None, "chunks": []})["chunks"].append(h)
+        docstore.close()
+        return {"documents": documents, "chunks": chunks, "retired": []}
+
+    def save(self) -> None:
+        with open(self.file + ".tmp", "w") as f:
+            json.dump({"documents": self.documents, "chunks": self.chunks, "retired": self.retired}, f)
+        os.replace(self.file + ".tmp", self.file)
+
+
+def retired_rows(path: str) -> List[int]:
+    """
+    Rows hidden from search after their project was re-ingested.
+    """
+    file = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(file):
+        return []
+    with open(file) as f:
+        return json.load(f).get("retired", [])
+
+
+# ============================================================
+# STORE WRITER
+# ============================================================
+
+class StoreIngestor:
+    """
+    Buffers new chunks for one store and flushes them in windows.
+    """
+
+    def __init__(self, path: str, embedder: Embeddings, batch_size: int, concurrency: int):
+        self.path = path
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.manifest = Manifest(path)
+        self.pending: List[Tuple[str, str, Dict]] = []   # (chunk hash, text, meta)
+        self.added = 0
+        self.retired = 0
+
+    def offer(self, key: str, doc_hash: str, chunks: List[Tuple[str, Dict]]) -> bool:
+        """
+        Queue a project's chunks; skip whatever the manifest already has.
+        Returns False if the project is unchanged.
+        """
+        previous = self.manifest.documents.get(key)
+        if previous and previous["hash"] == doc_hash:
+            return False
+
+        hashes = []
+        queued = {h for h, _, _ in self.pending}
+        for text, meta in chunks:
+            h = _hash(text)
+            hashes.append(h)
+            if h not in self.manifest.chunks and h not in queued:
+                self.pending.append((h, text, meta))
+                queued.add(h)
+
+        if previous:
+            dropped = set(previous["chunks"]) - set(hashes)
+            for h in dropped:
+                row = self.manifest.chunks.pop(h, None)
+                if row is not None:
+                    self.manifest.retired.append(row)
+                    self.retired += 1
+
+        self.manifest.documents[key] = {"hash": doc_hash, "chunks": hashes}
+        return True
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        async with self.semaphore:
+            return await self.embedder.aembed_documents(texts)
+
+    async def flush(self) -> None:
+        if not self.pending:
+            self.manifest.save()
+            return
+
+        pending, self.pending = self.pending, []
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        results = await asyncio.gather(*(self._embed([t for _, t, _ in b]) for b in batches))
+        vectors = np.asarray([v for batch in results for v in batch], dtype=np.float32)
+
+        first = self._append_vectors(vectors)
+        rows: List[Row] = [(str(uuid.uuid4()), text, meta) for _, text, meta in pending]
+        start, _ = columnar.append_columnar(self.path, rows)
+        if start != first:
+            raise RuntimeError(f"Index and docstore out of sync in {self.path}: {first} != {start}")
+
+        for offset, (h, _, _) in enumerate(pending):
+            self.manifest.chunks[h] = first + offset
+        self.manifest.save()
+        self.added += len(pending)
+        logger.info(f"{self.path}: appended {len(pending)} chunks")
+
+    def _append_vectors(self, vectors: np.ndarray) -> int:
+        """
+        Add to the flat index and every ANN variant built from it.
+        Returns the row id of the first new vector.
+        """
+        first = None
+        for name in sorted(os.listdir(self.path)):
+            if not (name.startswith("index") and name.endswith(".faiss")):
+                continue
+            file = os.path.join(self.path, name)
+            index = faiss.read_index(file)
+            if index.d != vectors.shape[1]:
+                raise ValueError(f"{file} has dimension {index.d}, embeddings have {vectors.shape[1]}")
+            ntotal = index.ntotal
+            if first is None:
+                first = ntotal
+            elif ntotal != first:
+                raise RuntimeError(f"{file} has {ntotal} rows, expected {first}")
+            index.add(vectors)
+            faiss.write_index(index, file + ".tmp")
+            os.replace(file + ".tmp", file)
+        if first is None:
+            raise FileNotFoundError(f"No FAISS index in {self.path}")
+        return first
+
+    def finish(self) -> None:
+        if self.added:
+            build_sparse(self.path)
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+async def ingest(
+    source: str,
+    stores: Dict[str, str],
+    embedder: Embeddings,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = CONCURRENCY,
+    window: int = WINDOW_CHUNKS,
+) -> Dict:
+    """
+    Stream `source` into the stores ({"content": dir, "code": dir}).
+    """
+    writers = {
+        kind: StoreIngestor(path, embedder, batch_size, concurrency)
+        for kind, path in stores.items()
+    }
+    skipped = 0
+
+    for project in read_projects(source):
+        key = project.get("url") or project.get("title", "")
+        doc_hash = _hash(json.dumps(project, sort_keys=True))
+        chunks = project_chunks(project)
+        changed = False
+        for kind, writer in writers.items():
+            changed |= writer.offer(key, doc_hash, chunks.get(kind, []))
+            if len(writer.pending) >= window:
+                await writer.flush()
+        skipped += not changed
+
+    for writer in writers.values():
+        await writer.flush()
+        writer.finish()
+
+    summary = {
+        kind: {"added": w.added, "retired": w.retired, "chunks": len(w.manifest.chunks)}
+        for kind, w in writers.items()
+    }
+    summary["unchanged_projects"] = skipped
+    return summary
+
+
+def _default_embedder() -> Embeddings:
+    # documents are embedded as-is (no query normalization / caching)
+    from langchain_openai import OpenAIEmbeddings
+    from app.core.retriever import EMBED_MODEL, OPENAI_API_KEY
+    return OpenAIEmbeddings(model=EMBED_MODEL, openai_api_key=OPENAI_API_KEY)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.core.retriever import CODE_DB_PATH, CONTENT_DB_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="JSONL file of projects")
+    parser.add_argument("--content-store", default=CONTENT_DB_PATH)
+    parser.add_argument("--code-store", default=CODE_DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(ingest(
+        args.source,
+        {"content": args.content_store, "code": args.code_store},
+        _default_embedder(),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    ))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""
+Lazy registry for the heavy objects behind the API.
+
+Agents, the runner pool, the retriever and the caches pull in
+google-adk, google-genai, LangChain, the OpenAI client and FAISS, which
+takes seconds to import. The registry maps names to "module:attribute"
+targets (or factories) and only imports / builds them on first access,
+so the server can bind right away and load them afterwards:
+
+    services = LazyRegistry({"code_agent": "app.services.expert.assistants:code_agent"})
+    await services.load()          # off the event loop, e.g. in a warm-up task
+    services.code_agent            # imported on first access otherwise
+"""
+
+import time
+import asyncio
+import logging
+import importlib
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger("LazyRegistry")
+
+Target = Union[str, Callable[[], Any]]
+
+
+class LazyRegistry:
+    def __init__(self, targets: Dict[str, Target]):
+        self._targets = dict(targets)
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._loading: Optional[asyncio.Lock] = None
+        self.load_seconds: Dict[str, float] = {}
+
+    def _build(self, name: str) -> Any:
+        target = self._targets[name]
+        if callable(target):
+            return target()
+        module, _, attribute = target.partition(":")
+        return getattr(importlib.import_module(module), attribute)
+
+    def get(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+        if name not in self._targets:
+            raise AttributeError(f"Nothing registered as {name!r}")
+        with self._lock:
+            if name not in self._values:
+                start = time.perf_counter()
+                self._values[name] = self._build(name)
+                self.load_seconds[name] = round(time.perf_counter() - start, 3)
+                logger.info(f"Loaded {name} in {self.load_seconds[name]}s")
+        return self._values[name]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get(name)
+
+    def peek(self, name: str) -> Any:
+        """
+        The object if it's already loaded, else None (never imports).
+        """
+        return self._values.get(name)
+
+    @property
+    def loaded(self) -> bool:
+        return len(self._values) == len(self._targets)
+
+    async def load(self) -> None:
+        """
+        Import / build everything not loaded yet in a worker thread, so
+        the event loop keeps serving meanwhile. Concurrent callers wait
+        for the same load.
+        """
+        if self.loaded:
+            return
+        if self._loading is None:
+            self._loading = asyncio.Lock()
+        async with self._loading:
+            for name in self._targets:
+                if name not in self._values:
+                    await asyncio.to_thread(self.get, name)
+
+    def stats(self) -> Dict:
+        return {
+            "registered": len(self._targets),
+            "loaded": len(self._values),
+            "load_seconds": dict(self.load_seconds),
+        }
@@ -0,0 +1,147 @@
+"""
+Model factory for the agents.
+
+All agents build their model through `gemini_model` so every call goes
+through the process-wide rate limiter in app.core.rate_limit. With
+FAKE_LLM=1 they get the offline FakeLlm instead (app.core.fakes), behind
+the same limiter. Inside a request's usage scope each call is also held
+to the endpoint's token budget (app.core.usage).
+"""
+
+import time
+import asyncio
+import logging
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from google.genai.errors import APIError
+
+from app.core.fakes import FAKE_LLM, FakeLlm
+from app.core.rate_limit import limiter_for, retry_after
+from app.core.telemetry import RATE_LIMITED, RATE_LIMIT_WAIT, observe
+from app.core.usage import current_usage
+
+logger = logging.getLogger("LLM")
+
+# retried when retry_options don't list their own codes (the client's default)
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+def apply_budget(llm_request: LlmRequest) -> None:
+    """
+    Refuse the call once the current request spent its token budget
+    (TokenBudgetExceeded), otherwise cap its max_output_tokens.
+    """
+    usage = current_usage()
+    if usage is None:
+        return
+    usage.check()
+    cap = usage.output_cap(llm_request.config.max_output_tokens)
+    if cap:
+        llm_request.config.max_output_tokens = cap
+
+
+def _backoff(options: types.HttpRetryOptions, attempt: int) -> float:
+    delay = (options.initial_delay or 1) * (options.exp_base or 2) ** attempt
+    return min(delay, options.max_delay or 60)
+
+
+async def rate_limited(
+    model: str,
+    call: Callable[[], AsyncGenerator],
+    retry_options: Optional[types.HttpRetryOptions] = None,
+) -> AsyncGenerator[LlmResponse, None]:
+    """
+    Run `call` (one model request) behind `model`'s limiter, retrying it
+    per `retry_options` above the limiter: every attempt takes its own
+    token, and every 429 is fed back into the limiter, whose cooldown
+    then paces the retry. Errors after the first streamed chunk are not
+    retried.
+    """
+    limiter = limiter_for(model)
+    attempts = (retry_options.attempts or 1) if retry_options else 1
+    codes = (retry_options.http_status_codes or RETRY_STATUS_CODES) if retry_options else ()
+    with observe("llm", current=False, model=model) as obs:
+        for attempt in range(attempts):
+            start = time.perf_counter()
+            await limiter.acquire()
+            RATE_LIMIT_WAIT.observe(time.perf_counter() - start, model=model)
+            streamed = False
+            try:
+                async for response in call():
+                    streamed = True
+                    yield response
+            except APIError as e:
+                if e.code == 429:
+                    RATE_LIMITED.inc(model=model)
+                    obs.set("llm.rate_limited", True)
+                    limiter.penalize(retry_after(e))
+                if streamed or e.code not in codes or attempt + 1 >= attempts:
+                    raise
+                obs.set("llm.attempts", attempt + 2)
+                logger.warning(f"⚠️ {model} returned {e.code}, retrying ({attempt + 2}/{attempts})")
+                if e.code != 429:
+                    await asyncio.sleep(_backoff(retry_options, attempt))
+                continue
+            limiter.reward()
+            return
+
+
+class RateLimitedGemini(Gemini):
+    """
+    Gemini that takes a token from its model's limiter before each call
+    and each retry, and feeds 429s / successes back into it. Retries
+    happen here (`rate_limit_retry`), not in the genai client, which
+    would retry past the limiter.
+    """
+
+    rate_limit_retry: Optional[types.HttpRetryOptions] = None
+
+    async def generate_content_async(
+        self,
+        llm_request: LlmRequest,
+        stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        apply_budget(llm_request)
+        generate = super().generate_content_async
+        responses = rate_limited(
+            llm_request.model or self.model, lambda: generate(llm_request, stream), self.rate_limit_retry
+        )
+        async for response in responses:
+            yield response
+
+
+class RateLimitedFakeLlm(FakeLlm):
+    """
+    FakeLlm behind the same limiter and retries, for offline benchmarks.
+    """
+
+    rate_limit_retry: Optional[types.HttpRetryOptions] = None
+
+    async def generate_content_async(
+        self,
+        llm_request: LlmRequest,
+        stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        apply_budget(llm_request)
+        generate = super().generate_content_async
+        responses = rate_limited(
+            llm_request.model or self.model, lambda: generate(llm_request, stream), self.rate_limit_retry
+        )
+        async for response in responses:
+            yield response
+
+
+def gemini_model(model: str, **kwargs) -> Gemini:
+    """
+    Rate-limited Gemini model for an agent (FakeLlm when FAKE_LLM is set).
+    `retry_options` are applied above the limiter, the client itself
+    never retries.
+    """
+    retry = kwargs.pop("retry_options", None)
+    if FAKE_LLM:
+        return RateLimitedFakeLlm(model=model, rate_limit_retry=retry)
+    return RateLimitedGemini(model=model, rate_limit_retry=retry, **kwargs)
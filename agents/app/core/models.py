@@ -6,6 +6,7 @@ class ProjectDescriptionRequest(BaseModel):
 
 class ProjectRequest(BaseModel):
     project_topic: str
+    session_id: Optional[str] = None # Groups /code-agent output for compile/flash
 
 class MainAgentResponse(BaseModel):
     description_agent_output: str
@@ -13,6 +14,7 @@ class MainAgentResponse(BaseModel):
 
 class CodeAgentResponse(BaseModel):
     code: str
+    sketch_id: Optional[str] = None # Pass to /arduino/compile and /arduino/flash
 
 class QARequest(BaseModel):
     query: str
@@ -32,7 +34,13 @@ class AdaptiveModulesResponse(BaseModel):
 
 class CompileRequest(BaseModel):
     fqbn: str
+    sketch_id: Optional[str] = None
+    session_id: Optional[str] = None # Latest sketch of this session if no sketch_id
+    code: Optional[str] = None # Stores the sketch again if it was evicted
 
 class FlashRequest(BaseModel):
     fqbn: str
     port: str
+    sketch_id: Optional[str] = None
+    session_id: Optional[str] = None
+    code: Optional[str] = None
@@ -0,0 +1,172 @@
+"""
+Process-wide adaptive rate limiting for Gemini calls.
+
+One token bucket per model. Every request takes a token before it goes
+out; when the bucket is empty callers queue (by reservation, so they are
+served in arrival order) instead of firing and collecting 429s.
+
+The refill rate adapts to what the API tells us (AIMD):
+
+- a 429 halves the rate and puts the bucket into debt for the
+  Retry-After / RetryInfo delay, pausing every caller of that model;
+- each success adds a little rate back, up to the configured ceiling.
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger("RateLimit")
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# ceiling per model, requests per minute
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+# requests allowed back to back before the rate applies
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "4"))
+
+MIN_RPM = 1.0
+DECREASE_FACTOR = 0.5
+INCREASE_RPM = 0.5          # added back per successful call
+DEFAULT_COOLDOWN = 5.0      # seconds, when a 429 carries no delay hint
+MAX_COOLDOWN = 120.0
+
+_DELAY_RE = re.compile(r"^\s*([0-9.]+)\s*s?\s*$")
+
+
+# ============================================================
+# LIMITER
+# ============================================================
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate follows 429 feedback.
+
+    State is guarded by a thread lock (not an asyncio lock) so one
+    instance can be shared by every event loop in the process.
+    """
+
+    def __init__(self, name: str, rpm: float = GEMINI_RPM, burst: float = GEMINI_BURST):
+        self.name = name
+        self.max_rate = rpm / 60.0
+        self.min_rate = min(MIN_RPM, rpm) / 60.0
+        self.rate = self.max_rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how long to wait before using it.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            self.requests += 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+            return delay
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            logger.debug(f"{self.name}: waiting {delay:.2f}s for a slot")
+            await asyncio.sleep(delay)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """
+        Back off after a 429: cut the rate and hold everyone for the
+        server-suggested delay.
+        """
+        cooldown = min(retry_after if retry_after is not None else DEFAULT_COOLDOWN, MAX_COOLDOWN)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            # debt worth `cooldown` seconds at the new rate
+            self.tokens = min(self.tokens, 0.0) - cooldown * self.rate
+            self.throttled += 1
+        logger.warning(
+            f"{self.name}: 429, backing off {cooldown:.1f}s, rate now {self.rate * 60:.1f} rpm"
+        )
+
+    def reward(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + INCREASE_RPM / 60.0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rpm": round(self.rate * 60, 2),
+                "max_rpm": round(self.max_rate * 60, 2),
+                "tokens": round(self.tokens, 2),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited, 2),
+            }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def limiter_for(model: str) -> AdaptiveRateLimiter:
+    """
+    The shared limiter of a model (created on first use).
+    """
+    with _registry_lock:
+        if model not in _limiters:
+            _limiters[model] = AdaptiveRateLimiter(model)
+        return _limiters[model]
+
+
+def rate_limit_stats() -> Dict[str, Dict]:
+    with _registry_lock:
+        limiters = dict(_limiters)
+    return {model: limiter.stats() for model, limiter in limiters.items()}
+
+
+# ============================================================
+# 429 PARSING
+# ============================================================
+
+def _parse_delay(value) -> Optional[float]:
+    if value is None:
+        return None
+    match = _DELAY_RE.match(str(value))
+    return float(match.group(1)) if match else None
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Server-suggested delay of a 429, from the Retry-After header or the
+    google.rpc.RetryInfo detail ("retryDelay": "12s"). None if absent.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        delay = _parse_delay(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in (details.get("error") or details).get("details", []) or []:
+            if isinstance(detail, dict) and "retryDelay" in detail:
+                delay = _parse_delay(detail["retryDelay"])
+                if delay is not None:
+                    return delay
+    return None
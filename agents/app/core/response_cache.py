@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config import AGENT_CONFIG_VERSION
+from app.core.embedding_cache import normalize_text
+from app.core.telemetry import CACHE_LOOKUPS
+
+logger = logging.getLogger("ResponseCache")
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, "cache", "responses.sqlite3")
+
+CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH)
+LRU_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# cosine similarity above which two topics share a response
+# ("gas leak detector" ~ "gas leakage detector"); 0 disables semantic hits
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))
+
+
+def scope_of(endpoint: str, version: str = AGENT_CONFIG_VERSION) -> str:
+    """
+    Entries only match within one endpoint and agent config version, so
+    bumping AGENT_CONFIG_VERSION invalidates every cached response.
+    """
+    return f"{endpoint}@{version}"
+
+
+def response_key(scope: str, topic: str) -> str:
+    payload = f"{scope}\x00{normalize_text(topic)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class _Entry:
+    scope: str
+    topic: str
+    payload: Dict
+    expires: float
+    vector: Optional[np.ndarray] = None
+
+
+# ============================================================
+# STORAGE
+# ============================================================
+
+class _SqliteTier:
+    """
+    Persistent response table, so cached answers survive restarts.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, scope TEXT NOT NULL, topic TEXT NOT NULL,"
+            " payload TEXT NOT NULL, vector BLOB, expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scope, topic, payload, vector, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def recent(self, limit: int) -> List[tuple]:
+        """
+        (key, entry) of the newest unexpired rows, to warm the LRU.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, scope, topic, payload, vector, expires FROM responses"
+                " WHERE expires > ? ORDER BY expires DESC LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [(row[0], self._entry(row[1:])) for row in reversed(rows)]
+
+    def put(self, key: str, entry: _Entry) -> None:
+        vector = entry.vector.astype(np.float32).tobytes() if entry.vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, topic, payload, vector, expires)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry.scope, entry.topic, json.dumps(entry.payload), vector, entry.expires),
+            )
+            self._conn.commit()
+
+    def purge(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+            self._conn.commit()
+
+    @staticmethod
+    def _entry(row) -> _Entry:
+        scope, topic, payload, vector, expires = row
+        return _Entry(
+            scope=scope,
+            topic=topic,
+            payload=json.loads(payload),
+            expires=expires,
+            vector=np.frombuffer(vector, dtype=np.float32) if vector else None,
+        )
+
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+
+class ResponseCache:
+    """
+    Cache of final endpoint responses keyed on endpoint, normalized topic
+    and agent config version.
+
+    A lookup is an exact key match first, then the most similar cached
+    topic of the same scope by embedding cosine similarity. Entries live
+    in a bounded LRU, optionally backed by SQLite, and expire after
+    `ttl` seconds. SQLite is only touched from worker threads, never on
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        path: Optional[str] = CACHE_PATH,
+        lru_size: int = LRU_SIZE,
+        ttl: float = TTL_SECONDS,
+        threshold: float = SIMILARITY_THRESHOLD,
+        name: str = "responses",
+    ):
+        self.name = name
+        self.embeddings = embeddings
+        self.lru_size = lru_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lru: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _SqliteTier(path) if path else None
+        self._warmed = False
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    # ---------- tiers ----------
+
+    async def _warm(self) -> None:
+        if self._warmed or not self._disk:
+            return
+        self._warmed = True
+        await asyncio.to_thread(self._load)
+
+    def _load(self) -> None:
+        try:
+            self._disk.purge()
+            for key, entry in self._disk.recent(self.lru_size):
+                self._remember(key, entry)
+        except sqlite3.Error:
+            logger.exception("Failed to load cached responses")
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    async def _exact(self, key: str, now: float) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if entry.expires > now:
+                    self._lru.move_to_end(key)
+                    return entry
+                del self._lru[key]
+        if self._disk:
+            try:
+                entry = await asyncio.to_thread(self._disk.get, key)
+            except sqlite3.Error:
+                logger.exception("Failed to read cached response")
+                return None
+            if entry is not None and entry.expires > now:
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _similar(self, scope: str, vector: np.ndarray, now: float) -> Optional[_Entry]:
+        with self._lock:
+            candidates = [
+                entry for entry in self._lru.values()
+                if entry.scope == scope and entry.vector is not None and entry.expires > now
+            ]
+        if not candidates:
+            return None
+        scores = np.stack([entry.vector for entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            logger.info(f"Semantic hit ({scores[best]:.3f}): '{candidates[best].topic}'")
+            return candidates[best]
+        return None
+
+    async def _embed(self, topic: str) -> Optional[np.ndarray]:
+        if self.embeddings is None or self.threshold <= 0 or not topic.strip():
+            return None
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(normalize_text(topic)), dtype=np.float32)
+        except Exception as e:
+            # no embedding backend: exact matches still work
+            logger.warning(f"Topic embedding failed, exact matching only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _count(self, exact: int = 0, semantic: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.exact_hits += exact
+            self.semantic_hits += semantic
+            self.misses += misses
+        for result, count in (("exact", exact), ("semantic", semantic), ("miss", misses)):
+            if count:
+                CACHE_LOOKUPS.inc(count, cache=self.name, result=result)
+
+    # ---------- public API ----------
+
+    async def get(self, endpoint: str, topic: str) -> Optional[Dict]:
+        """
+        Cached response body for `topic` on `endpoint`, or None.
+        """
+        await self._warm()
+        scope = scope_of(endpoint)
+        now = time.time()
+
+        entry = await self._exact(response_key(scope, topic), now)
+        if entry is not None:
+            self._count(exact=1)
+            return entry.payload
+
+        vector = await self._embed(topic)
+        entry = self._similar(scope, vector, now) if vector is not None else None
+        if entry is not None:
+            self._count(semantic=1)
+            return entry.payload
+
+        self._count(misses=1)
+        return None
+
+    async def put(self, endpoint: str, topic: str, payload: Dict) -> None:
+        await self._warm()
+        scope = scope_of(endpoint)
+        key = response_key(scope, topic)
+        entry = _Entry(
+            scope=scope,
+            topic=normalize_text(topic),
+            payload=payload,
+            expires=time.time() + self.ttl,
+            vector=await self._embed(topic),
+        )
+        self._remember(key, entry)
+        if self._disk:
+            try:
+                await asyncio.to_thread(self._disk.put, key, entry)
+            except sqlite3.Error:
+                logger.exception("Failed to persist response")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._lru),
+                "config_version": AGENT_CONFIG_VERSION,
+            }
@@ -1,10 +1,16 @@
 import os
+import asyncio
 import logging
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from app.core.context import CONTEXT_TOKEN_BUDGET, pack_context
+from app.core.embedding_cache import CachedEmbeddings
+from app.core.fakes import FAKE_EMBEDDINGS, FAKE_EMBED_DIM, FakeEmbeddings
+from app.core.telemetry import observe
+from app.core.vectorstore import LazyVectorStore
 
 # ============================================================
 # ENV
@@ -23,8 +29,22 @@ CONTENT_DB_PATH = os.path.join(BASE_DIR, "faiss_content")
 CODE_DB_PATH = os.path.join(BASE_DIR, "faiss_code")
 
 # retrieval tuning
-MAX_RESULTS = 12          # pull more context
 FINAL_CONTEXT_LIMIT = 6   # send best to LLM
+MAX_RESULTS = 3 * FINAL_CONTEXT_LIMIT   # candidates from each side, fused then truncated
+
+# index variant built by app.core.index_builder (flat | hnsw | ivfpq)
+INDEX_VARIANT = os.getenv("FAISS_INDEX_VARIANT", "flat")
+NPROBE = int(os.getenv("FAISS_NPROBE", "0")) or None          # ivfpq only, else the index's own (nlist/8)
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "0")) or None    # hnsw only
+
+# hybrid ranking: reciprocal-rank fusion of FAISS and BM25 results
+# below 0.5 a keyword-only hit can never outrank the dense top hits, so
+# exact identifiers (pin names, part numbers) would never reach the context
+KEYWORD_WEIGHT = float(os.getenv("RETRIEVAL_KEYWORD_WEIGHT", "0.5"))  # 0 = dense only
+RRF_K = 60
+
+# async tools run FAISS/BM25 in this many worker threads
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("UniversalRetriever")
@@ -33,110 +53,423 @@ logger = logging.getLogger("UniversalRetriever")
 # INIT
 # ============================================================
 
-embeddings = OpenAIEmbeddings(
-    model=EMBED_MODEL,
-    openai_api_key=OPENAI_API_KEY
-)
-
-print("Loading FAISS indexes...")
-
-content_db = FAISS.load_local(
-    CONTENT_DB_PATH,
-    embeddings,
-    allow_dangerous_deserialization=True
+def _openai_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(
+        model=EMBED_MODEL,
+        openai_api_key=OPENAI_API_KEY
+    )
+
+# query embeddings are content-addressed and cached (LRU + SQLite),
+# so the OpenAI client is only built on the first cache miss;
+# FAKE_EMBEDDINGS=1 swaps in the offline hash embedder (app.core.fakes)
+if FAKE_EMBEDDINGS:
+    embeddings = CachedEmbeddings(factory=FakeEmbeddings, model=f"fake-hash-{FAKE_EMBED_DIM}")
+else:
+    embeddings = CachedEmbeddings(factory=_openai_embeddings, model=EMBED_MODEL)
+
+# indexes are memory-mapped on first search, not at import time
+content_db = LazyVectorStore(
+    CONTENT_DB_PATH, embeddings,
+    variant=INDEX_VARIANT, nprobe=NPROBE, ef_search=EF_SEARCH
 )
-
-code_db = FAISS.load_local(
-    CODE_DB_PATH,
-    embeddings,
-    allow_dangerous_deserialization=True
+code_db = LazyVectorStore(
+    CODE_DB_PATH, embeddings,
+    variant=INDEX_VARIANT, nprobe=NPROBE, ef_search=EF_SEARCH
 )
 
-print("FAISS indexes loaded.\n")
+# CPU-bound search work of the async tools, off the event loop
+_search_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
 
 # ============================================================
 # CORE RETRIEVAL
 # ============================================================
 
+def _build_context(docs) -> Tuple[List[Dict], str]:
+    """
+    Turn (doc, score) pairs into match dicts and the LLM context string.
+    """
+    matches = []
+    context_blocks = []
+
+    for i, (doc, score) in enumerate(docs):
+        meta = doc.metadata or {}
+
+        block = f"""
+### RESULT {i+1}
+Project: {meta.get("title","unknown")}
+Section: {meta.get("section","")}
+Source: {meta.get("url","")}
+
+{doc.page_content}
+"""
+        context_blocks.append(block.strip())
+
+        matches.append({
+            "score": float(score),
+            "content": doc.page_content,
+            "metadata": meta
+        })
+
+    return matches, "\n\n".join(context_blocks)
+
+
+def _fuse(
+    dense_hits: List[Tuple[int, float]],
+    keyword_hits: List[Tuple[int, float]],
+    keyword_weight: float
+) -> List[Tuple[int, float]]:
+    """
+    Reciprocal-rank fusion of dense (distance, lower is better) and
+    keyword (BM25, higher is better) hits. Returns (row, fused score)
+    pairs, best first.
+    """
+    fused: Dict[int, float] = {}
+
+    # sort by best similarity
+    for rank, (row, _) in enumerate(sorted(dense_hits, key=lambda x: x[1])):
+        fused[row] = fused.get(row, 0.0) + (1 - keyword_weight) / (RRF_K + rank + 1)
+
+    for rank, (row, _) in enumerate(keyword_hits):
+        fused[row] = fused.get(row, 0.0) + keyword_weight / (RRF_K + rank + 1)
+
+    return sorted(fused.items(), key=lambda x: -x[1])
+
+
+def _rank(
+    db: LazyVectorStore,
+    query: str,
+    dense_hits: List[Tuple[int, float]],
+    keyword_weight: Optional[float],
+    row_filter=None
+) -> List[Tuple[int, float]]:
+    """
+    Final (row, score) ranking for one query, truncated to the context limit.
+    """
+    weight = KEYWORD_WEIGHT if keyword_weight is None else min(max(keyword_weight, 0.0), 1.0)
+    keyword_hits = db.keyword_search(query, k=MAX_RESULTS, row_filter=row_filter) if weight > 0 else []
+    return _fuse(dense_hits, keyword_hits, weight)[:FINAL_CONTEXT_LIMIT]
+
+
+def _row_filter(db: LazyVectorStore, project: Optional[str], section: Optional[str]):
+    """
+    Resolve project/section filters to a row mask. Returns (filter, status)
+    where status is None (no filter), "applied" or "no_match" (nothing
+    matched, so the search falls back to the whole store).
+    """
+    row_filter = db.filter_mask(project, section)
+    if row_filter is None:
+        return None, None
+    if not row_filter[0].any():
+        return None, "no_match"
+    return row_filter, "applied"
+
+
 def _retrieve(
-    db: FAISS,
+    db: LazyVectorStore,
     query: str,
-    search_type: str
+    search_type: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None,
+    vector: Optional[List[float]] = None
 ) -> Dict:
     """
     High-context retrieval optimized for RAG agents.
+    Scores are fusion scores, higher is better.
+    Pass `vector` to skip embedding (async callers embed up front).
     """
 
     try:
-        # pull MANY candidates first
-        docs = db.similarity_search_with_score(query, k=MAX_RESULTS)
+        row_filter, filter_status = _row_filter(db, project, section)
 
-        if not docs:
+        # pull MANY candidates first (ids + scores only)
+        if vector is None:
+            vector = db.embeddings.embed_query(query)
+        dense_hits = db.search_by_vector(vector, k=MAX_RESULTS, row_filter=row_filter)
+        hits = _rank(db, query, dense_hits, keyword_weight, row_filter)
+
+        if not hits:
             return {"status": "no_match", "query": query}
 
-        # sort by best similarity
-        docs = sorted(docs, key=lambda x: x[1])
+        # only decode the winning rows from the docstore
+        docs = list(zip(db.get_documents([i for i, _ in hits]), [score for _, score in hits]))
+
+        # dedupe and fit into the token budget
+        docs, context_tokens = pack_context(docs, CONTEXT_TOKEN_BUDGET)
 
-        # take best N
-        docs = docs[:FINAL_CONTEXT_LIMIT]
+        matches, final_context = _build_context(docs)
+
+        return {
+            "status": "ok",
+            "query": query,
+            "type": search_type,
+            "match_count": len(matches),
+            "matches": matches,
+            "context_string": final_context,
+            "context_tokens": context_tokens,
+            "filter": filter_status
+        }
 
-        matches = []
-        context_blocks = []
+    except Exception as e:
+        logger.exception("Retrieval error")
+        return {
+            "status": "error",
+            "reason": str(e)
+        }
 
-        for i, (doc, score) in enumerate(docs):
-            meta = doc.metadata or {}
 
-            block = f"""
-### RESULT {i+1}
-Project: {meta.get("title","unknown")}
-Section: {meta.get("section","")}
-Source: {meta.get("url","")}
+def _clean_queries(queries: List[str]) -> List[str]:
+    return list(dict.fromkeys(q for q in queries if q and q.strip()))
 
-{doc.page_content}
-"""
-            context_blocks.append(block.strip())
 
-            matches.append({
-                "score": float(score),
-                "content": doc.page_content,
-                "metadata": meta
-            })
+def _retrieve_batch(
+    db: LazyVectorStore,
+    queries: List[str],
+    search_type: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None,
+    vectors: Optional[List[List[float]]] = None
+) -> Dict:
+    """
+    Multi-query retrieval: one embeddings request, one FAISS search over
+    the query matrix, results deduplicated across queries.
+    `vectors`, if given, must line up with the cleaned query list.
+    """
+
+    queries = _clean_queries(queries)
+    if not queries:
+        return {"status": "no_match", "queries": queries}
+
+    try:
+        row_filter, filter_status = _row_filter(db, project, section)
+
+        if vectors is None:
+            vectors = db.embeddings.embed_documents(queries)
+        per_query = db.search_by_vectors(vectors, k=MAX_RESULTS, row_filter=row_filter)
+
+        # keep each row once, under the query that ranks it best
+        best: Dict[int, Tuple[float, int]] = {}
+        for qi, hits in enumerate(per_query):
+            for row, score in _rank(db, queries[qi], hits, keyword_weight, row_filter):
+                if row not in best or score > best[row][0]:
+                    best[row] = (score, qi)
 
-        final_context = "\n\n".join(context_blocks)
+        if not best:
+            return {"status": "no_match", "queries": queries}
+
+        # group by query (in request order), best score first within a query
+        ordered = sorted(best.items(), key=lambda x: (x[1][1], -x[1][0]))
+        rows = [row for row, _ in ordered]
+        docs = list(zip(db.get_documents(rows), [score for _, (score, _) in ordered]))
+        query_of = {doc.id: queries[qi] for (doc, _), (_, (_, qi)) in zip(docs, ordered)}
+
+        # same budget as len(queries) separate calls would get
+        docs, context_tokens = pack_context(docs, CONTEXT_TOKEN_BUDGET * len(queries))
+
+        matches, final_context = _build_context(docs)
+        for match, (doc, _) in zip(matches, docs):
+            match["query"] = query_of.get(doc.id)
 
         return {
             "status": "ok",
-            "query": query,
+            "queries": queries,
             "type": search_type,
             "match_count": len(matches),
             "matches": matches,
-            "context_string": final_context
+            "context_string": final_context,
+            "context_tokens": context_tokens,
+            "filter": filter_status
         }
 
     except Exception as e:
-        logger.exception("Retrieval error")
+        logger.exception("Batch retrieval error")
         return {
             "status": "error",
             "reason": str(e)
         }
 
+async def _aretrieve(db: LazyVectorStore, query: str, search_type: str, *args) -> Dict:
+    """
+    Non-blocking _retrieve: async embedding, then search in the thread pool.
+    """
+    with observe("tool", tool=f"aretrieve_{search_type}") as obs:
+        try:
+            vector = await db.embeddings.aembed_query(query)
+        except Exception as e:
+            logger.exception("Embedding error")
+            obs.outcome = "error"
+            return {"status": "error", "reason": str(e)}
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _search_pool,
+            partial(_retrieve, db, query, search_type, *args, vector=vector)
+        )
+        obs.set("retrieval.status", result["status"])
+        obs.set("retrieval.matches", result.get("match_count", 0))
+        if result["status"] == "error":
+            obs.outcome = "error"
+        return result
+
+
+async def _aretrieve_batch(db: LazyVectorStore, queries: List[str], search_type: str, *args) -> Dict:
+    """
+    Non-blocking _retrieve_batch.
+    """
+    queries = _clean_queries(queries)
+    if not queries:
+        return {"status": "no_match", "queries": queries}
+
+    with observe("tool", tool=f"aretrieve_{search_type}_batch") as obs:
+        obs.set("retrieval.queries", len(queries))
+        try:
+            vectors = await db.embeddings.aembed_documents(queries)
+        except Exception as e:
+            logger.exception("Embedding error")
+            obs.outcome = "error"
+            return {"status": "error", "reason": str(e)}
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _search_pool,
+            partial(_retrieve_batch, db, queries, search_type, *args, vectors=vectors)
+        )
+        obs.set("retrieval.status", result["status"])
+        obs.set("retrieval.matches", result.get("match_count", 0))
+        if result["status"] == "error":
+            obs.outcome = "error"
+        return result
+
 # ============================================================
 # PUBLIC API
 # ============================================================
 
-def retrieve_content(query: str) -> Dict:
+def retrieve_content(
+    query: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    For project explanation agent
+    (theory, working, components, overview)
+
+    keyword_weight (0-1) shifts ranking towards exact keyword matches;
+    raise it for part numbers or pin names (e.g. "MQ-2 A0 pin").
+    project / section restrict the search to matching project titles
+    (e.g. "gas leak detector") or section names (e.g. "Circuit Diagram").
+    """
+    return _retrieve(content_db, query, "content", keyword_weight, project, section)
+
+def retrieve_code(
+    query: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    For code agent
+    (arduino, sensors, libraries, sketches)
+
+    keyword_weight (0-1) shifts ranking towards exact keyword matches;
+    raise it for function or library names (e.g. "HC-SR04 pulseIn").
+    project / section restrict the search to matching project titles
+    or section names (e.g. "Complete Project Code").
+    """
+    return _retrieve(code_db, query, "code", keyword_weight, project, section)
+
+def retrieve_content_batch(
+    queries: List[str],
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    Batched retrieve_content: pass several related questions at once
+    (e.g. wiring + working principle of the same project)
+    """
+    return _retrieve_batch(content_db, queries, "content", keyword_weight, project, section)
+
+def retrieve_code_batch(
+    queries: List[str],
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    Batched retrieve_code: pass several related code questions at once
+    (e.g. sensor driver + display library for the same sketch)
+    """
+    return _retrieve_batch(code_db, queries, "code", keyword_weight, project, section)
+
+# ---------- async variants (registered as ADK tools) ----------
+
+async def aretrieve_content(
+    query: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
     """
     For project explanation agent
     (theory, working, components, overview)
+
+    keyword_weight (0-1) shifts ranking towards exact keyword matches;
+    raise it for part numbers or pin names (e.g. "MQ-2 A0 pin").
+    project / section restrict the search to matching project titles
+    (e.g. "gas leak detector") or section names (e.g. "Circuit Diagram").
     """
-    return _retrieve(content_db, query, "content")
+    return await _aretrieve(content_db, query, "content", keyword_weight, project, section)
 
-def retrieve_code(query: str) -> Dict:
+async def aretrieve_code(
+    query: str,
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
     """
     For code agent
     (arduino, sensors, libraries, sketches)
+
+    keyword_weight (0-1) shifts ranking towards exact keyword matches;
+    raise it for function or library names (e.g. "HC-SR04 pulseIn").
+    project / section restrict the search to matching project titles
+    or section names (e.g. "Complete Project Code").
+    """
+    return await _aretrieve(code_db, query, "code", keyword_weight, project, section)
+
+async def aretrieve_content_batch(
+    queries: List[str],
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    Batched retrieve_content: pass several related questions at once
+    (e.g. wiring + working principle of the same project)
+    """
+    return await _aretrieve_batch(content_db, queries, "content", keyword_weight, project, section)
+
+async def aretrieve_code_batch(
+    queries: List[str],
+    keyword_weight: Optional[float] = None,
+    project: Optional[str] = None,
+    section: Optional[str] = None
+) -> Dict:
+    """
+    Batched retrieve_code: pass several related code questions at once
+    (e.g. sensor driver + display library for the same sketch)
+    """
+    return await _aretrieve_batch(code_db, queries, "code", keyword_weight, project, section)
+
+def embedding_cache_stats() -> Dict:
+    """
+    Hit/miss counters of the query-embedding cache
     """
-    return _retrieve(code_db, query, "code")
+    return embeddings.stats()
 
 # ============================================================
 # TEST
@@ -0,0 +1,156 @@
+"""
+Reusable ADK runners with per-request sessions.
+
+One InMemoryRunner per agent is shared by all requests. Each run gets a
+fresh session that is deleted as soon as the run ends, so the in-memory
+session service doesn't grow with uptime. A runner is retired after
+RUNNER_MAX_USES runs or RUNNER_MAX_AGE seconds and closed once its last
+in-flight run finishes; the next request builds a replacement.
+"""
+
+import os
+import time
+import uuid
+import logging
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app.core.telemetry import observe, record_usage
+from app.core.usage import ledger
+
+logger = logging.getLogger("RunnerPool")
+
+RUNNER_MAX_USES = int(os.getenv("RUNNER_MAX_USES", "500"))
+RUNNER_MAX_AGE = float(os.getenv("RUNNER_MAX_AGE", "3600"))
+
+POOL_USER_ID = "pool_user"
+
+
+class _PooledRunner:
+    def __init__(self, agent):
+        self.runner = InMemoryRunner(agent=agent)
+        self.created = time.monotonic()
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+    def expired(self, max_uses: int, max_age: float) -> bool:
+        return self.uses >= max_uses or time.monotonic() - self.created >= max_age
+
+
+class RunnerPool:
+    """
+    Runner cache keyed by agent. Meant to be used from one event loop
+    (the server's); nothing here blocks, so no locking is needed.
+    """
+
+    def __init__(self, max_uses: int = RUNNER_MAX_USES, max_age: float = RUNNER_MAX_AGE):
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._runners: Dict[int, _PooledRunner] = {}
+        self.created = 0
+        self.recycled = 0
+
+    def _checkout(self, agent) -> _PooledRunner:
+        entry = self._runners.get(id(agent))
+        if entry is not None and entry.expired(self.max_uses, self.max_age):
+            entry.retired = True
+            self.recycled += 1
+            del self._runners[id(agent)]
+            entry = None
+        if entry is None:
+            entry = _PooledRunner(agent)
+            self._runners[id(agent)] = entry
+            self.created += 1
+        entry.uses += 1
+        entry.active += 1
+        return entry
+
+    def warm(self, agent) -> None:
+        """
+        Build `agent`'s runner ahead of its first run (startup warm-up).
+        """
+        if id(agent) not in self._runners:
+            self._runners[id(agent)] = _PooledRunner(agent)
+            self.created += 1
+
+    async def _checkin(self, entry: _PooledRunner) -> None:
+        entry.active -= 1
+        if entry.retired and entry.active == 0:
+            logger.info(f"Closing recycled runner for {entry.runner.agent.name}")
+            await entry.runner.close()
+
+    @asynccontextmanager
+    async def session(self, agent, state: Optional[Dict] = None) -> AsyncIterator:
+        """
+        (runner, session) for one run, optionally seeded with `state`;
+        the session is deleted afterwards.
+        """
+        entry = self._checkout(agent)
+        runner = entry.runner
+        session = None
+        try:
+            session = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id=POOL_USER_ID, state=state, session_id=str(uuid.uuid4())
+            )
+            yield runner, session
+        finally:
+            if session is not None:
+                await runner.session_service.delete_session(
+                    app_name=runner.app_name, user_id=POOL_USER_ID, session_id=session.id
+                )
+            await self._checkin(entry)
+
+    async def events(
+        self,
+        agent,
+        prompt: str,
+        run_config: Optional[RunConfig] = None,
+        state: Optional[Dict] = None,
+    ) -> AsyncIterator[Event]:
+        """
+        Stream the events of one run of `agent` on `prompt`, recording
+        the run's duration and token usage (app.core.telemetry,
+        app.core.usage).
+        """
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        tokens = 0
+        with observe("agent", current=False, agent=agent.name) as obs:
+            async with self.session(agent, state) as (runner, session):
+                async with aclosing(runner.run_async(
+                    user_id=POOL_USER_ID,
+                    session_id=session.id,
+                    new_message=message,
+                    run_config=run_config or RunConfig(),
+                )) as stream:
+                    async for event in stream:
+                        # streamed chunks are repeated in the final event
+                        if not event.partial and event.usage_metadata is not None:
+                            record_usage(event.author, event.usage_metadata)
+                            ledger.record(event.author, event.model_version, event.usage_metadata)
+                            tokens += event.usage_metadata.total_token_count or 0
+                            obs.set("llm.total_tokens", tokens)
+                        yield event
+
+    async def run(self, agent, prompt: str, state: Optional[Dict] = None) -> List[Event]:
+        """
+        All events of one run (the pooled equivalent of `run_debug`).
+        """
+        return [event async for event in self.events(agent, prompt, state=state)]
+
+    def stats(self) -> Dict:
+        return {
+            "runners": len(self._runners),
+            "created": self.created,
+            "recycled": self.recycled,
+            # sessions live exactly as long as their run
+            "active_runs": sum(entry.active for entry in self._runners.values()),
+        }
+
+
+runner_pool = RunnerPool()
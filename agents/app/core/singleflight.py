@@ -0,0 +1,137 @@
+"""
+Request coalescing for identical in-flight calls.
+
+The first caller for a key starts the work as a task; callers arriving
+while it runs await the same task instead of starting their own. Every
+caller awaits through `asyncio.shield`, so one client disconnecting
+doesn't cancel the work for the others. The task is only cancelled when
+the last caller waiting on it goes away.
+
+`stream` does the same for async iterators (the SSE endpoints): one task
+consumes the iterator into a buffer, and every subscriber gets all items
+from the first one, replayed if it joined late, then live.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("SingleFlight")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.items: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.wake = asyncio.Event()
+
+    def notify(self) -> None:
+        self.wake.set()
+        self.wake = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent `do(key, fn)` calls into one run of `fn`.
+    Results are not kept after the call completes (that's the response
+    cache's job).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _Stream] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.shared += 1
+            logger.info(f"Joining in-flight call for {key}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller gave up (e.g. all clients disconnected)
+                logger.info(f"Cancelling abandoned call for {key}")
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Coalesces concurrent `stream(key, fn)` calls into one iteration
+        of `fn()`; each caller gets every item. An error raised by the
+        iterator is raised to every caller.
+        """
+        call = self._streams.get(key)
+        if call is None:
+            call = _Stream()
+            call.task = asyncio.ensure_future(self._produce(key, call, fn))
+            self._streams[key] = call
+            self.leaders += 1
+        else:
+            self.shared += 1
+            logger.info(f"Joining in-flight stream for {key}")
+
+        call.subscribers += 1
+        sent = 0
+        try:
+            while True:
+                while sent < len(call.items):
+                    yield call.items[sent]
+                    sent += 1
+                if call.finished:
+                    if call.error is not None:
+                        raise call.error
+                    return
+                await call.wake.wait()
+        finally:
+            call.subscribers -= 1
+            if call.subscribers == 0 and not call.task.done():
+                logger.info(f"Cancelling abandoned stream for {key}")
+                call.task.cancel()
+                self._forget_stream(key, call)
+
+    async def _produce(self, key: Hashable, call: _Stream, fn: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for item in fn():
+                call.items.append(item)
+                call.notify()
+        except Exception as e:
+            call.error = e
+        finally:
+            call.finished = True
+            call.notify()
+            self._forget_stream(key, call)
+
+    def _forget_stream(self, key: Hashable, call: _Stream) -> None:
+        if self._streams.get(key) is call:
+            del self._streams[key]
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
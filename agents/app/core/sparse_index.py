@@ -0,0 +1,190 @@
+"""
+Prebuilt BM25 inverted index over the docstore chunks.
+
+Complements the dense FAISS search for queries that hinge on exact
+identifiers ("MQ-2 A0 pin", "HC-SR04 pulseIn"), which embeddings tend
+to blur. Row ids are FAISS row ids, so results fuse directly.
+
+Layout inside an index directory (CSR postings, memory-mapped):
+
+    sparse.meta.json     vocabulary and BM25 parameters
+    sparse.indptr.npy    int64[V + 1] postings offsets per term
+    sparse.rows.npy      int32 row ids, grouped by term
+    sparse.tf.npy        float32 term frequencies, parallel to rows
+    sparse.doclen.npy    float32[N] token count per row
+
+Build after the columnar docstore:
+
+    python -m app.core.sparse_index app/core/faiss_content app/core/faiss_code
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.docstore import ColumnarDocstore, save_array
+
+logger = logging.getLogger("SparseIndex")
+
+META_FILE = "sparse.meta.json"
+INDPTR_FILE = "sparse.indptr.npy"
+ROWS_FILE = "sparse.rows.npy"
+TF_FILE = "sparse.tf.npy"
+DOCLEN_FILE = "sparse.doclen.npy"
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# part numbers and identifiers: "mq-2", "hc-sr04", "a0", "pulsein", "3.3v"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase tokens. Compound identifiers are kept whole and also
+    emitted joined and split ("hc-sr04" -> hc-sr04, hcsr04, sr04), so
+    spelling variants of a part number still match. Split fragments
+    shorter than 3 characters ("hc", "2") are too ambiguous to keep.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = _SPLIT_RE.split(token)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+            tokens.extend(p for p in parts if len(p) >= 3)
+    return tokens
+
+
+def exists(path: str) -> bool:
+    return os.path.exists(os.path.join(path, META_FILE))
+
+
+# ============================================================
+# READER
+# ============================================================
+
+class SparseIndex:
+    """
+    Memory-mapped BM25 index.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported sparse index version in {path}: {meta.get('version')}")
+
+        self.vocab: Dict[str, int] = {term: i for i, term in enumerate(meta["terms"])}
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.avgdl = meta["avgdl"]
+
+        self.indptr = np.load(os.path.join(path, INDPTR_FILE), mmap_mode="r")
+        self.rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode="r")
+        self.tf = np.load(os.path.join(path, TF_FILE), mmap_mode="r")
+        self.doclen = np.load(os.path.join(path, DOCLEN_FILE), mmap_mode="r")
+        self.size = len(self.doclen)
+        self._norm = self.k1 * (1 - self.b + self.b * np.asarray(self.doclen) / self.avgdl)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every row for the query (0 where no term matches).
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.indptr[term_id]), int(self.indptr[term_id + 1])
+            rows = np.asarray(self.rows[start:end])
+            tf = np.asarray(self.tf[start:end])
+            df = end - start
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + self._norm[rows])
+
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (row id, BM25 score) pairs, best first. `mask` is an
+        optional boolean array restricting the eligible rows.
+        """
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0
+        k = min(k, self.size)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def build_sparse(path: str) -> int:
+    """
+    Build the BM25 index for the columnar docstore in `path`.
+    """
+    docstore = ColumnarDocstore(path)
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    doclen = np.zeros(len(docstore), dtype=np.float32)
+
+    for row in range(len(docstore)):
+        counts = Counter(tokenize(docstore.text(row)))
+        doclen[row] = sum(counts.values())
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((row, tf))
+    docstore.close()
+
+    terms = sorted(postings)
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    rows, tfs = [], []
+    for i, term in enumerate(terms):
+        entries = postings[term]
+        indptr[i + 1] = indptr[i] + len(entries)
+        rows.extend(r for r, _ in entries)
+        tfs.extend(tf for _, tf in entries)
+
+    save_array(os.path.join(path, INDPTR_FILE), indptr)
+    save_array(os.path.join(path, ROWS_FILE), np.asarray(rows, dtype=np.int32))
+    save_array(os.path.join(path, TF_FILE), np.asarray(tfs, dtype=np.float32))
+    save_array(os.path.join(path, DOCLEN_FILE), doclen)
+
+    tmp_meta = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "k1": BM25_K1,
+            "b": BM25_B,
+            "avgdl": max(float(doclen.mean()), 1.0) if len(doclen) else 1.0,
+            "terms": terms,
+        }, f)
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    logger.info(f"Wrote sparse index for {path} ({len(terms)} terms, {len(doclen)} rows)")
+    return len(terms)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for store_path in sys.argv[1:]:
+        build_sparse(store_path)
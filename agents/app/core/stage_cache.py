@@ -0,0 +1,98 @@
+"""
+Stage-level memoization for the beginner pipelines.
+
+`curriculum_designer` and `resource_gatherer` depend only on the topic,
+so their `output_key` values are cached per pipeline, stage, prompt
+version and AGENT_CONFIG_VERSION (see app.core.response_cache), matched
+on the exact prompt. On a hit the stage doesn't run: its cached output
+is injected into the session state through a `state_delta` event, and
+only the remaining stages call Gemini.
+"""
+
+import os
+import hashlib
+import logging
+from contextlib import aclosing
+from typing import AsyncGenerator, List
+
+from google.adk.agents import SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.core.response_cache import DEFAULT_CACHE_PATH, ResponseCache
+
+logger = logging.getLogger("StageCache")
+
+STAGE_CACHE_PATH = os.getenv(
+    "STAGE_CACHE_PATH", os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), "stages.sqlite3")
+)
+
+# Exact matches only: stages see the whole templated prompt, not the
+# bare topic, and the shared template makes prompts for different
+# projects score above any useful similarity threshold.
+stage_cache = ResponseCache(path=STAGE_CACHE_PATH, threshold=0, name="stages")
+
+
+def prompt_version(agent) -> str:
+    """
+    Short hash of what determines a stage's output besides the topic:
+    its instruction and model. Editing either invalidates the stage.
+    """
+    model = getattr(agent, "model", "")
+    parts = [str(getattr(agent, "instruction", "")), str(getattr(model, "model", model))]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+class MemoizedSequentialAgent(SequentialAgent):
+    """
+    SequentialAgent that serves the stages named in `cached_stages` from
+    the stage cache. A stage is only reused while every cached stage
+    before it was reused too, so e.g. cached resources are never paired
+    with a freshly generated curriculum.
+    """
+
+    cached_stages: List[str] = []
+
+    def _stage_key(self, agent) -> str:
+        return f"stage:{self.name}/{agent.name}#{prompt_version(agent)}"
+
+    def _user_text(self, ctx: InvocationContext) -> str:
+        parts = getattr(ctx.user_content, "parts", None) or []
+        return "".join(part.text for part in parts if getattr(part, "text", None))
+
+    def _cached_event(self, ctx: InvocationContext, agent, output) -> Event:
+        text = output if isinstance(output, str) else str(output)
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=agent.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta={agent.output_key: output}),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        topic = self._user_text(ctx)
+        reuse = True
+
+        for agent in self.sub_agents:
+            output_key = getattr(agent, "output_key", None)
+            memoized = agent.name in self.cached_stages and output_key and topic.strip()
+
+            if memoized and reuse:
+                hit = await stage_cache.get(self._stage_key(agent), topic)
+                if hit is not None:
+                    logger.info(f"⚡ Reusing cached {agent.name} output")
+                    yield self._cached_event(ctx, agent, hit["output"])
+                    continue
+            reuse = False
+
+            async with aclosing(agent.run_async(ctx)) as events:
+                async for event in events:
+                    yield event
+                    if ctx.should_pause_invocation(event):
+                        return
+
+            output = ctx.session.state.get(output_key) if memoized else None
+            if output not in (None, ""):
+                await stage_cache.put(self._stage_key(agent), topic, {"output": output})
@@ -0,0 +1,127 @@
+"""
+Incremental agent output for the /stream endpoints.
+
+Agents run through their pooled runner in SSE streaming mode, so text is
+forwarded as Gemini produces it instead of after the whole event list.
+Frames go out as Server-Sent Events:
+
+    event: delta   data: {"agent": "desc_agent", "text": "..."}
+    event: done    data: <the endpoint's usual response body>
+    event: error   data: {"detail": "..."}       ("status": 429 when the
+                                                   token budget ran out)
+"""
+
+import json
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from google.adk.agents.run_config import RunConfig, StreamingMode
+
+from app.core.runner_pool import runner_pool
+from app.core.usage import TokenBudgetExceeded
+
+logger = logging.getLogger("Streaming")
+
+Frame = Tuple[str, Dict]
+
+
+def _event_text(event) -> str:
+    content = getattr(event, "content", None)
+    parts = getattr(content, "parts", None) or []
+    return "".join(part.text for part in parts if getattr(part, "text", None) and not getattr(part, "thought", False))
+
+
+async def stream_agent(
+    agent,
+    prompt: str,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Yield (author, text delta) pairs as the agent generates.
+
+    Partial events carry the deltas; the aggregated event that closes a
+    streamed response is skipped, and non-streamed text (e.g. from an
+    agent that doesn't stream) is forwarded whole. Joining the deltas of
+    an author gives the same text as extract_text_from_events.
+    Runs on the agent's pooled runner in a throwaway session.
+    """
+    streamed = set()
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    async with asyncio.timeout(timeout):
+        async with aclosing(runner_pool.events(agent, prompt, run_config)) as events:
+            async for event in events:
+                author = getattr(event, "author", None)
+                if author == "user":
+                    continue
+                text = _event_text(event)
+                if event.partial:
+                    streamed.add(author)
+                    if text:
+                        yield author, text
+                elif author in streamed:
+                    streamed.discard(author)
+                elif text:
+                    yield author, text
+
+
+async def merge_streams(*streams: AsyncIterator) -> AsyncIterator:
+    """
+    Interleave several async iterators, yielding items as they arrive.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+            await queue.put(done)
+        except BaseException as e:
+            await queue.put(e)
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _format(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(frames: AsyncIterator[Frame]) -> StreamingResponse:
+    """
+    Serve (event, data) frames as text/event-stream. A failure mid-stream
+    becomes an `error` frame, since the status line is already sent.
+    """
+    async def body():
+        try:
+            async for event, data in frames:
+                yield _format(event, data)
+        except TokenBudgetExceeded as e:
+            logger.warning(f"⚠️ Stream stopped: {e}")
+            yield _format("error", {"detail": str(e), "status": 429})
+        except Exception as e:
+            logger.error(f"❌ Stream failed: {e}")
+            yield _format("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
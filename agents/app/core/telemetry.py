@@ -0,0 +1,300 @@
+"""
+Metrics and tracing for routes, agent runs, LLM calls, tools and
+arduino-cli.
+
+Metrics live in a small in-process registry rendered in the Prometheus
+text format at GET /metrics (no client library needed). Spans go through
+the OpenTelemetry API: they are no-ops unless OTEL_EXPORTER_OTLP_ENDPOINT
+is set and the OTLP exporter package is installed, in which case they
+(and ADK's own agent/LLM/tool spans) are exported to that collector.
+
+    with observe("tool", tool="aretrieve_content"):
+        ...                     # span + duration histogram + outcome counter
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from opentelemetry import trace
+
+logger = logging.getLogger("Telemetry")
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "embedai-agents")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+METRIC_PREFIX = "embedai"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ============================================================
+# METRICS
+# ============================================================
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(key)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[len(self.buckets)] += 1
+            entry[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = {key: list(entry) for key, entry in self._values.items()}
+        for key, entry in sorted(values.items()):
+            for bound, count in zip(self.buckets, entry):
+                yield f"{self.name}_bucket{_labels(key, (('le', _number(bound)),))} {count}"
+            count = entry[len(self.buckets)]
+            yield f"{self.name}_bucket{_labels(key, (('le', '+Inf'),))} {count}"
+            yield f"{self.name}_sum{_labels(key)} {_number(round(entry[-1], 6))}"
+            yield f"{self.name}_count{_labels(key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str):
+        name = f"{METRIC_PREFIX}_{name}"
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def histogram(self, name: str, help: str) -> Histogram:
+        return self._get(Histogram, name, help)
+
+    def render(self, gauges: Optional[Dict[str, Dict]] = None) -> str:
+        """
+        Prometheus text exposition. `gauges` adds point-in-time values,
+        e.g. {"response_cache": response_cache.stats()}: every numeric
+        field becomes `embedai_response_cache_<field>`.
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for group, stats in (gauges or {}).items():
+            for field, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{METRIC_PREFIX}_{group}_{field}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+DURATION = {
+    "http": registry.histogram("http_request_seconds", "HTTP request duration by route."),
+    "agent": registry.histogram("agent_run_seconds", "Agent run duration (runner pool), by root agent."),
+    "llm": registry.histogram("llm_call_seconds", "Model call duration including rate-limit wait, by model."),
+    "tool": registry.histogram("tool_call_seconds", "ADK tool invocation duration, by tool."),
+    "arduino_cli": registry.histogram("arduino_cli_seconds", "arduino-cli subprocess duration, by command."),
+}
+OUTCOMES = {
+    kind: registry.counter(f"{name}_total", f"{kind} operations by outcome.")
+    for kind, name in (
+        ("http", "http_requests"), ("agent", "agent_runs"), ("llm", "llm_calls"),
+        ("tool", "tool_calls"), ("arduino_cli", "arduino_cli_runs"),
+    )
+}
+TOKENS = registry.counter("llm_tokens_total", "Model tokens by agent and kind (prompt | output | thoughts).")
+RATE_LIMITED = registry.counter("llm_rate_limited_total", "429 responses by model (retried above the limiter).")
+RATE_LIMIT_WAIT = registry.histogram("rate_limit_wait_seconds", "Time spent waiting for a rate-limiter token.")
+CACHE_LOOKUPS = registry.counter("cache_lookups_total", "Response/stage cache lookups by cache and result.")
+
+
+# ============================================================
+# SPANS
+# ============================================================
+
+class Observation:
+    """
+    Handle on an observed block: span attributes, and an outcome for
+    failures that are returned rather than raised.
+    """
+
+    def __init__(self, span: trace.Span):
+        self.span = span
+        self.outcome: Optional[str] = None
+
+    def set(self, key: str, value) -> None:
+        self.span.set_attribute(key, value)
+
+
+@contextmanager
+def observe(kind: str, current: bool = True, **labels) -> Iterator[Observation]:
+    """
+    Time a block as `kind` (agent | llm | tool | arduino_cli): a span
+    with the labels as attributes, a duration observation and an
+    ok / error / cancelled outcome count.
+
+    Use current=False inside async generators: their span must not
+    become the caller's current span across yields.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    span = tracer.start_as_current_span(kind, attributes=labels) if current else tracer.start_span(kind, attributes=labels)
+    with span as active:
+        observation = Observation(active)
+        try:
+            yield observation
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            outcome = observation.outcome or outcome
+            DURATION[kind].observe(time.perf_counter() - start, **labels)
+            OUTCOMES[kind].inc(**labels, outcome=outcome)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: a span per request plus duration (until the last
+    body chunk, so streamed responses count in full) and status per
+    route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+        finished = False
+
+        def record():
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = {"route": route, "method": scope["method"]}
+            DURATION["http"].observe(time.perf_counter() - start, **labels)
+            OUTCOMES["http"].inc(**labels, outcome=str(status["code"]))
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", status["code"])
+
+        async def send_wrapper(message):
+            nonlocal finished
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not finished:
+                finished = True
+                record()
+
+        with tracer.start_as_current_span(f"{scope['method']} {scope['path']}") as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if not finished:
+                    finished = True
+                    record()
+
+
+def record_usage(agent: str, usage) -> None:
+    """
+    Count the tokens of one event's usage_metadata under its agent.
+    """
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("thoughts", "thoughts_token_count")):
+        count = getattr(usage, field, None)
+        if count:
+            TOKENS.inc(count, agent=agent, kind=kind)
+
+
+def setup_tracing() -> None:
+    """
+    Export spans over OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT is set
+    (opentelemetry-exporter-otlp-proto-http, in requirements.txt).
+    """
+    if not OTLP_ENDPOINT:
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp-proto-http is not installed")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Exporting traces to {OTLP_ENDPOINT}")
@@ -0,0 +1,226 @@
+"""
+Token accounting and per-endpoint budgets.
+
+Routes serve each request inside `usage_scope(endpoint, topic)`. While it
+is active (the context variable is inherited by the tasks the request
+spawns):
+
+- the token usage of every agent event (usage_metadata) is added to the
+  request and to the process-wide ledger, per endpoint, agent and topic,
+  with an estimated cost (GET /usage);
+- the model wrapper (app.core.llm) caps each call's max_output_tokens at
+  the endpoint's budget and raises TokenBudgetExceeded before a call once
+  the request has spent its max_request_tokens.
+
+Budgets come from ROUTE_TOKEN_BUDGETS in app.config.
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from app.config import ROUTE_TOKEN_BUDGETS
+
+logger = logging.getLogger("Usage")
+
+# USD per 1M tokens (input, output); thinking tokens bill as output
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+MAX_TOPICS = 500
+
+
+class TokenBudgetExceeded(Exception):
+    """
+    The request already used its endpoint's max_request_tokens.
+    """
+
+
+def cost_of(model: str, prompt: int, output: int) -> float:
+    for name, (input_price, output_price) in sorted(MODEL_PRICES.items(), key=lambda item: -len(item[0])):
+        if model and name in model:
+            return (prompt * input_price + output * output_price) / 1e6
+    return 0.0
+
+
+@dataclass
+class Tally:
+    calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    thoughts_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens + self.thoughts_tokens
+
+    def add(self, prompt: int, output: int, thoughts: int, cost: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt
+        self.output_tokens += output
+        self.thoughts_tokens += thoughts
+        self.cost_usd += cost
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "thoughts_tokens": self.thoughts_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+@dataclass
+class RequestUsage:
+    """
+    Token usage and budget of one request.
+    """
+
+    endpoint: str
+    topic: str = ""
+    max_output_tokens: Optional[int] = None
+    max_request_tokens: Optional[int] = None
+    tally: Tally = field(default_factory=Tally)
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.max_request_tokens is None:
+            return None
+        return max(self.max_request_tokens - self.tally.total_tokens, 0)
+
+    def output_cap(self, requested: Optional[int]) -> Optional[int]:
+        """
+        max_output_tokens for the next call: the smallest of what the
+        agent asked for, the endpoint cap and what is left of the budget.
+        """
+        caps = [cap for cap in (requested, self.max_output_tokens, self.remaining) if cap]
+        return min(caps) if caps else None
+
+    def check(self) -> None:
+        if self.remaining == 0:
+            ledger.rejected(self.endpoint)
+            raise TokenBudgetExceeded(
+                f"Token budget of {self.endpoint} exhausted "
+                f"({self.tally.total_tokens}/{self.max_request_tokens} tokens)"
+            )
+
+
+_current: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("request_usage", default=None)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    return _current.get()
+
+
+@contextmanager
+def usage_scope(endpoint: str, topic: Optional[str] = "") -> Iterator[RequestUsage]:
+    """
+    Account the model calls made inside the block to `endpoint` / `topic`
+    and apply the endpoint's budget to them (/stream routes use the
+    budget of their non-streaming endpoint).
+    """
+    budget = ROUTE_TOKEN_BUDGETS.get(endpoint, {})
+    usage = RequestUsage(
+        endpoint=endpoint,
+        topic=topic or "",
+        max_output_tokens=budget.get("max_output_tokens"),
+        max_request_tokens=budget.get("max_request_tokens"),
+    )
+    token = _current.set(usage)
+    ledger.started(endpoint)
+    try:
+        yield usage
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # an async generator closed from another context
+            _current.set(None)
+
+
+class TokenLedger:
+    """
+    Process-wide token totals per endpoint, per endpoint + agent and per
+    topic (most recent MAX_TOPICS topics).
+    """
+
+    def __init__(self, max_topics: int = MAX_TOPICS):
+        self.max_topics = max_topics
+        self.started_at = time.time()
+        self._endpoints: Dict[str, Tally] = {}
+        self._agents: Dict[tuple, Tally] = {}
+        self._topics: "OrderedDict[tuple, Tally]" = OrderedDict()
+        self._requests: Dict[str, int] = {}
+        self._rejections: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def started(self, endpoint: str) -> None:
+        with self._lock:
+            self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+
+    def rejected(self, endpoint: str) -> None:
+        with self._lock:
+            self._rejections[endpoint] = self._rejections.get(endpoint, 0) + 1
+
+    def record(self, agent: str, model: Optional[str], usage_metadata) -> None:
+        """
+        Add one event's usage_metadata, under the current request's
+        endpoint and topic (or "(none)" outside a usage scope).
+        """
+        prompt = getattr(usage_metadata, "prompt_token_count", None) or 0
+        output = getattr(usage_metadata, "candidates_token_count", None) or 0
+        thoughts = getattr(usage_metadata, "thoughts_token_count", None) or 0
+        cost = cost_of(model or "", prompt, output + thoughts)
+
+        request = current_usage()
+        endpoint = request.endpoint if request else "(none)"
+        if request is not None:
+            request.tally.add(prompt, output, thoughts, cost)
+
+        with self._lock:
+            self._endpoints.setdefault(endpoint, Tally()).add(prompt, output, thoughts, cost)
+            self._agents.setdefault((endpoint, agent), Tally()).add(prompt, output, thoughts, cost)
+            if request is not None and request.topic:
+                key = (endpoint, request.topic)
+                self._topics.setdefault(key, Tally()).add(prompt, output, thoughts, cost)
+                self._topics.move_to_end(key)
+                while len(self._topics) > self.max_topics:
+                    self._topics.popitem(last=False)
+
+    def summary(self, top: int = 20) -> Dict:
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    **tally.as_dict(),
+                    "requests": self._requests.get(endpoint, 0),
+                    "budget_rejections": self._rejections.get(endpoint, 0),
+                    "budget": ROUTE_TOKEN_BUDGETS.get(endpoint),
+                }
+                for endpoint, tally in self._endpoints.items()
+            }
+            agents = [
+                {"endpoint": endpoint, "agent": agent, **tally.as_dict()}
+                for (endpoint, agent), tally in self._agents.items()
+            ]
+            topics = sorted(
+                ({"endpoint": endpoint, "topic": topic, **tally.as_dict()} for (endpoint, topic), tally in self._topics.items()),
+                key=lambda row: -row["total_tokens"],
+            )[:top]
+        return {
+            "since": self.started_at,
+            "endpoints": endpoints,
+            "agents": sorted(agents, key=lambda row: -row["total_tokens"]),
+            "top_topics": topics,
+        }
+
+
+ledger = TokenLedger()
@@ -1,7 +1,8 @@
 import asyncio
 import logging
 from google.genai import types
-from google.adk.runners import InMemoryRunner
+from app.core.runner_pool import runner_pool
+from app.core.usage import TokenBudgetExceeded
 
 logger = logging.getLogger("BeginnerUtils")
 
@@ -53,13 +54,12 @@ async def run_agent(
 ):
     """
     Generic agent runner without JSON validation.
+    Runs on the agent's pooled runner in a throwaway session.
     """
-    runner = InMemoryRunner(agent=agent)
-
     logger.info("▶️ Running agent...")
     try:
         events = await asyncio.wait_for(
-            runner.run_debug(prompt, quiet=True),
+            runner_pool.run(agent, prompt),
             timeout=timeout,
         )
         
@@ -67,16 +67,20 @@ async def run_agent(
         logger.info("✅ Agent completed successfully")
         return output_text
         
+    except TokenBudgetExceeded:
+        # surfaced to the client as a 429, not as an empty answer
+        raise
     except Exception as e:
         import traceback
         logger.error(f"❌ Agent execution failed: {e}")
         logger.error(traceback.format_exc())
 
-async def run_agent_with_retry(runner, prompt):
+async def run_agent_with_retry(agent, prompt):
     """
     Retry logic for agent execution.
+    (429s are retried/paced by the model wrapper, see app.core.llm)
     """
-    events = await runner.run_debug(prompt)
+    events = await runner_pool.run(agent, prompt)
     return extract_text_from_events(events)
 
 # Alias for compatibility if needed, though run_agent covers beginner logic
@@ -0,0 +1,314 @@
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.core import docstore as columnar
+from app.core.docstore import ColumnarDocstore
+from app.core.index_builder import apply_search_params, index_file
+from app.core.ingest import retired_rows
+from app.core import sparse_index
+from app.core.sparse_index import SparseIndex
+
+logger = logging.getLogger("VectorStore")
+
+# ============================================================
+# INDEX LOADING
+# ============================================================
+
+def read_index_mmap(path: str, variant: str = "flat") -> faiss.Index:
+    """
+    Open a FAISS index with its vectors memory-mapped read-only.
+
+    Pages are shared through the OS page cache, so every uvicorn worker
+    maps the same physical memory instead of holding a private copy.
+    IO_FLAG_MMAP only maps IVF inverted lists, so the flat and HNSW
+    variants (whose vectors sit in flat code storage) use IO_FLAG_MMAP_IFC.
+    Index types without mmap support fall back to a regular read.
+    """
+    mmap = faiss.IO_FLAG_MMAP if variant.startswith("ivf") else faiss.IO_FLAG_MMAP_IFC
+    try:
+        return faiss.read_index(path, mmap | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        logger.warning(f"mmap not supported for {path}, reading into memory")
+        return faiss.read_index(path)
+
+
+# ============================================================
+# METADATA FILTERS
+# ============================================================
+
+_FILTER_STOPWORDS = {
+    "a", "an", "the", "and", "of", "for", "to", "with", "using", "how",
+    "make", "build", "project", "arduino", "diy", "based", "in", "on",
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+MASK_CACHE_SIZE = 256
+FILTERED_EF_SEARCH = 256
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def match_values(values: List[str], query: str) -> List[int]:
+    """
+    Indices of dictionary values matching a loose filter: every
+    significant query word must prefix some word of the value, so
+    "gas leak detector" matches "Gas Leakage Detector Using Arduino".
+    """
+    wanted = [w for w in _words(query) if w not in _FILTER_STOPWORDS] or _words(query)
+    if not wanted:
+        return []
+    matched = []
+    for i, value in enumerate(values):
+        words = _words(value)
+        if all(any(word.startswith(w) for word in words) for w in wanted):
+            matched.append(i)
+    return matched
+
+
+def _search_params(index: faiss.Index, selector) -> faiss.SearchParameters:
+    """
+    SearchParameters of the right subtype, keeping the index's own knobs.
+    A selective filter can leave the nearest IVF lists / HNSW neighbours
+    empty, so filtered searches probe every IVF list and widen the HNSW
+    beam; the selector keeps non-matching rows cheap to skip.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nlist)
+    if hasattr(index, "hnsw"):
+        ef_search = max(index.hnsw.efSearch, FILTERED_EF_SEARCH)
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    return faiss.SearchParameters(sel=selector)
+
+
+# ============================================================
+# STORE
+# ============================================================
+
+class LazyVectorStore:
+    """
+    Read-only FAISS store that defers all disk work to the first search.
+
+    Drop-in for the subset of the LangChain FAISS API used by the retriever
+    (`similarity_search_with_score`). Scores are raw index distances,
+    lower is better.
+
+    `variant` selects an approximate index built by app.core.index_builder
+    (flat | hnsw | ivfpq); `nprobe`/`ef_search` tune it at query time.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embeddings: Embeddings,
+        variant: str = "flat",
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ):
+        self.path = path
+        self.embeddings = embeddings
+        self.variant = variant
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._index = None
+        self._docstore = None
+        self._sparse = None
+        self._retired = None
+        self._masks: "OrderedDict[Tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._mask_lock = threading.Lock()
+
+    # ---------- lazy members ----------
+
+    @property
+    def index(self) -> faiss.Index:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    index_path = os.path.join(self.path, index_file(self.variant))
+                    logger.info(f"Mapping FAISS index {index_path}")
+                    index = read_index_mmap(index_path, self.variant)
+                    apply_search_params(index, nprobe=self.nprobe, ef_search=self.ef_search)
+                    self._index = index
+        return self._index
+
+    @property
+    def docstore(self) -> ColumnarDocstore:
+        if self._docstore is None:
+            with self._lock:
+                if self._docstore is None:
+                    if not columnar.exists(self.path):
+                        # normally done at build time (see Dockerfile)
+                        logger.warning(f"No columnar docstore in {self.path}, converting index.pkl")
+                        columnar.convert_pickle(self.path)
+                    self._docstore = ColumnarDocstore(self.path)
+        return self._docstore
+
+    @property
+    def sparse(self) -> SparseIndex:
+        if self._sparse is None:
+            _ = self.docstore  # the sparse build reads the columnar store
+            with self._lock:
+                if self._sparse is None:
+                    if not sparse_index.exists(self.path):
+                        logger.warning(f"No sparse index in {self.path}, building it")
+                        sparse_index.build_sparse(self.path)
+                    self._sparse = SparseIndex(self.path)
+        return self._sparse
+
+    @property
+    def retired(self) -> np.ndarray:
+        """
+        Rows superseded by re-ingestion, excluded from every search.
+        """
+        if self._retired is None:
+            self._retired = np.asarray(sorted(retired_rows(self.path)), dtype=np.int64)
+        return self._retired
+
+    def filter_mask(
+        self,
+        project: Optional[str] = None,
+        section: Optional[str] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Boolean row mask (and its packed bitmap for FAISS) for a
+        project/section filter, built from the precomputed per-value row
+        sets and cached. None when no filter is given; an all-False mask
+        when nothing matches.
+        """
+        key = (project or "", section or "")
+        if key == ("", ""):
+            return None
+        with self._mask_lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+
+        docstore = self.docstore
+        mask = np.ones(len(docstore), dtype=bool)
+        for column, query in (("title", project), ("section", section)):
+            if not query:
+                continue
+            groups = docstore.rows_by_code(column)
+            codes = match_values(docstore.dictionaries.get(column, []), query)
+            allowed = np.zeros(len(docstore), dtype=bool)
+            for code in codes:
+                allowed[groups.get(code, [])] = True
+            mask &= allowed
+        if len(self.retired):
+            mask[self.retired] = False
+
+        entry = (mask, np.packbits(mask, bitorder="little"))
+        with self._mask_lock:
+            self._masks[key] = entry
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return entry
+
+    def get_documents(self, ids: List[int]) -> List[Document]:
+        """
+        Fetch documents by FAISS row id. Only these rows are decoded.
+        """
+        return self.docstore.get_many(ids)
+
+    def warm(self) -> None:
+        """
+        Force both the index and docstore to load (e.g. in a warm-up task).
+        """
+        _ = self.index
+        _ = self.docstore
+        _ = self.sparse
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None and self._docstore is not None
+
+    # ---------- search ----------
+
+    def search_by_vector(
+        self,
+        vector: List[float],
+        k: int,
+        row_filter: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Raw FAISS search returning (row id, distance) pairs.
+        """
+        return self.search_by_vectors([vector], k, row_filter)[0]
+
+    def search_by_vectors(
+        self,
+        vectors: List[List[float]],
+        k: int,
+        row_filter: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        One vectorized FAISS search for a matrix of queries.
+        `row_filter` (from filter_mask) restricts the search inside FAISS
+        via an ID-selector bitmap instead of post-filtering.
+        """
+        queries = np.asarray(vectors, dtype=np.float32)
+
+        if row_filter is not None:
+            _, bitmap = row_filter
+            selector = faiss.IDSelectorBitmap(bitmap)
+            distances, ids = self.index.search(queries, k, params=_search_params(self.index, selector))
+            return [
+                [(int(i), float(d)) for i, d in zip(row_ids, row_distances) if i != -1]
+                for row_ids, row_distances in zip(ids, distances)
+            ]
+
+        retired = self.retired
+        fetch = min(k + len(retired), self.index.ntotal)
+        distances, ids = self.index.search(queries, fetch)
+        if len(retired):
+            ids[np.isin(ids, retired)] = -1
+        return [
+            [(int(i), float(d)) for i, d in zip(row_ids, row_distances) if i != -1][:k]
+            for row_ids, row_distances in zip(ids, distances)
+        ]
+
+    def keyword_search(
+        self,
+        query: str,
+        k: int,
+        row_filter: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        BM25 search returning (row id, score) pairs, higher is better.
+        """
+        if row_filter is not None:
+            return self.sparse.search(query, k, mask=row_filter[0])
+
+        mask = None
+        if len(self.retired):
+            mask = np.ones(self.sparse.size, dtype=bool)
+            mask[self.retired] = False
+        return self.sparse.search(query, k, mask=mask)
+
+    def similarity_search_with_score_by_vector(
+        self,
+        vector: List[float],
+        k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_by_vector(vector, k)
+        docs = self.get_documents([i for i, _ in hits])
+        return [(doc, score) for doc, (_, score) in zip(docs, hits)]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        vector = self.embeddings.embed_query(query)
+        return self.similarity_search_with_score_by_vector(vector, k)
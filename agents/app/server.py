@@ -1,12 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.deps import warm_up
+from app.core.telemetry import MetricsMiddleware, setup_tracing
+from app.services.arduino import board_watcher
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # agents, runners and indexes load in the background: the server
+    # accepts requests (and answers /healthz) right away, /readyz turns
+    # 200 once this is done
+    warm = asyncio.create_task(warm_up())
+    yield
+    warm.cancel()
+    await asyncio.gather(warm, return_exceptions=True)
+    await board_watcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -17,6 +36,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# spans + Prometheus metrics per request (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+setup_tracing()
+
 app.include_router(router)
 
 if __name__ == "__main__":
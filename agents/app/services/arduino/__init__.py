@@ -0,0 +1,3 @@
+from .compiler import compiler, CompileError
+from .sketches import sketch_store, SketchNotFound
+from .boards import board_watcher
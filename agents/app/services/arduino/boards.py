@@ -0,0 +1,161 @@
+"""
+Background board discovery.
+
+One watcher task runs `arduino-cli board list` every BOARD_REFRESH_SECONDS
+and keeps the parsed result as an in-memory snapshot, so /arduino/boards
+answers from memory no matter how often the frontend polls. The snapshot
+carries a version that only changes when the board list does; clients
+can long-poll for the next version instead of polling.
+
+The watcher stops after BOARD_IDLE_SECONDS without readers and restarts
+on the next request, so an unattended server doesn't keep enumerating
+serial ports.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.core.telemetry import observe
+from app.services.arduino.compiler import ARDUINO_CLI
+
+logger = logging.getLogger("BoardWatcher")
+
+BOARD_REFRESH_SECONDS = float(os.getenv("BOARD_REFRESH_SECONDS", "2"))
+BOARD_IDLE_SECONDS = float(os.getenv("BOARD_IDLE_SECONDS", "120"))
+
+NO_BOARDS = {"boards": [], "message": "No connected boards found."}
+
+
+class BoardListError(Exception):
+    pass
+
+
+async def list_boards_once() -> Dict:
+    """
+    One `arduino-cli board list --format json` run, parsed.
+    """
+    with observe("arduino_cli", command="board list"):
+        try:
+            process = await asyncio.create_subprocess_exec(
+                ARDUINO_CLI, "board", "list", "--format", "json",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise BoardListError("'arduino-cli' not found. Please ensure it is installed and in your system's PATH.")
+
+        stdout, stderr = await process.communicate()
+    stdout, stderr = stdout.decode(errors="replace"), stderr.decode(errors="replace")
+    if process.returncode != 0:
+        raise BoardListError(
+            f"An error occurred with arduino-cli. Return code: {process.returncode}. Stderr: {stderr}. Stdout: {stdout}"
+        )
+    if not stdout.strip():
+        return NO_BOARDS
+    try:
+        return json.loads(stdout)
+    except json.JSONDecodeError:
+        raise BoardListError(f"Failed to parse JSON from arduino-cli. Raw output: {stdout}")
+
+
+class BoardWatcher:
+    def __init__(self, interval: float = BOARD_REFRESH_SECONDS, idle: float = BOARD_IDLE_SECONDS):
+        self.interval = interval
+        self.idle = idle
+        self.version = 0
+        self.boards: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.updated = 0.0
+        self.refreshes = 0
+        self._last_read = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    # ---------- watcher loop ----------
+
+    def _ensure_running(self) -> None:
+        self._last_read = time.monotonic()
+        if self._task is None or self._task.done():
+            # after an idle stop the old snapshot is stale: wait for a rescan
+            self._changed = self._changed or asyncio.Event()
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Board watcher started")
+
+    async def _run(self) -> None:
+        while time.monotonic() - self._last_read < self.idle:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+        logger.info("Board watcher idle, stopping")
+
+    async def refresh(self) -> None:
+        try:
+            boards, error = await list_boards_once(), None
+        except BoardListError as e:
+            boards, error = None, str(e)
+        except Exception as e:
+            boards, error = None, f"An unexpected error occurred: {str(e)}"
+
+        self.refreshes += 1
+        self.updated = time.time()
+        if boards != self.boards or error != self.error:
+            self.boards, self.error = boards, error
+            self.version += 1
+            # wake long-pollers, then arm a fresh event for the next change
+            changed, self._changed = self._changed, asyncio.Event()
+            if changed is not None:
+                changed.set()
+            logger.info(f"Board list changed (version {self.version})")
+        if self._ready is not None:
+            self._ready.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # ---------- readers ----------
+
+    async def snapshot(self) -> Dict:
+        """
+        Current board list; only waits for a scan when the watcher
+        was not running.
+        """
+        self._ensure_running()
+        await self._ready.wait()
+        return {"version": self.version, "boards": self.boards, "error": self.error, "updated": self.updated}
+
+    async def wait_for_change(self, since: int, timeout: float) -> Dict:
+        """
+        Long-poll: return once the version moves past `since`, or the
+        current snapshot after `timeout` seconds.
+        """
+        await self.snapshot()
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = self._changed  # grab before checking, so no change slips by
+            remaining = deadline - time.monotonic()
+            if self.version > since or remaining <= 0:
+                break
+            self._ensure_running()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(remaining, self.idle / 2))
+            except asyncio.TimeoutError:
+                pass
+        return await self.snapshot()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "refreshes": self.refreshes,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+board_watcher = BoardWatcher()
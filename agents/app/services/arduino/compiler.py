@@ -0,0 +1,252 @@
+"""
+Async arduino-cli compile/upload service.
+
+- compiles run as asyncio subprocesses, at most COMPILE_CONCURRENCY at a
+  time, so they never block the event loop;
+- every compile gets its own throwaway build directory, so compiles for
+  the same board run in parallel, while the core cache is shared per
+  FQBN, so the core is only rebuilt when it changes;
+- artifacts are content-addressed by sketch files + FQBN: compiling or
+  flashing an unchanged sketch reuses the existing build, and identical
+  concurrent compiles share one arduino-cli run;
+- an artifact is never pruned while an upload is reading it.
+"""
+
+import os
+import re
+import json
+import shutil
+import asyncio
+import tempfile
+import hashlib
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List
+
+from app.core.singleflight import SingleFlight
+from app.core.telemetry import observe
+
+logger = logging.getLogger("ArduinoCompiler")
+
+ARDUINO_CLI = os.getenv("ARDUINO_CLI", "arduino-cli")
+BUILD_ROOT = os.getenv("ARDUINO_BUILD_ROOT", os.path.join(os.getcwd(), "sketches", ".build"))
+COMPILE_CONCURRENCY = int(os.getenv("ARDUINO_COMPILE_CONCURRENCY", "2"))
+MAX_ARTIFACTS = int(os.getenv("ARDUINO_MAX_ARTIFACTS", "64"))
+MAX_ARTIFACT_BYTES = int(float(os.getenv("ARDUINO_MAX_ARTIFACT_MB", "256")) * 1e6)
+
+SKETCH_EXTENSIONS = (".ino", ".pde", ".h", ".hpp", ".c", ".cpp", ".S")
+RESULT_FILE = "compile.json"
+
+
+class CompileError(Exception):
+    """
+    arduino-cli exited non-zero; `output` holds its stderr.
+    """
+
+    def __init__(self, output: str):
+        super().__init__(output)
+        self.output = output
+
+
+@dataclass
+class BuildResult:
+    artifact_dir: str
+    output: str
+    cached: bool
+
+
+def _slug(fqbn: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", fqbn)
+
+
+def sketch_files(sketch_dir: str) -> List[str]:
+    return sorted(
+        name for name in os.listdir(sketch_dir)
+        if name.endswith(SKETCH_EXTENSIONS) and os.path.isfile(os.path.join(sketch_dir, name))
+    )
+
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, names in os.walk(path) for name in names
+    )
+
+
+def build_key(sketch_dir: str, fqbn: str) -> str:
+    """
+    Content address of a build: FQBN + name and bytes of every source
+    file. The sketch name is included since arduino-cli names the
+    artifacts after it.
+    """
+    digest = hashlib.sha256(fqbn.encode("utf-8"))
+    digest.update(b"\x00" + os.path.basename(os.path.normpath(sketch_dir)).encode("utf-8"))
+    for name in sketch_files(sketch_dir):
+        digest.update(b"\x00" + name.encode("utf-8") + b"\x00")
+        with open(os.path.join(sketch_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+async def run_cli(*args: str) -> str:
+    """
+    Run arduino-cli without blocking; stdout on success, CompileError
+    with stderr otherwise. FileNotFoundError if it isn't installed.
+    """
+    with observe("arduino_cli", command=args[0]):
+        process = await asyncio.create_subprocess_exec(
+            ARDUINO_CLI, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+            raise
+        if process.returncode != 0:
+            raise CompileError(stderr.decode(errors="replace") or stdout.decode(errors="replace"))
+        return stdout.decode(errors="replace")
+
+
+class ArduinoCompiler:
+    def __init__(self, root: str = BUILD_ROOT, concurrency: int = COMPILE_CONCURRENCY):
+        self.root = root
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._port_locks: Dict[str, asyncio.Lock] = {}
+        # artifact name -> uploads reading it (skipped by _prune)
+        self._in_use: Dict[str, int] = {}
+        self._flights = SingleFlight()
+        self.compiles = 0
+        self.cache_hits = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # created on first use, inside the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def artifact_dir(self, key: str) -> str:
+        return os.path.join(self.root, "artifacts", key)
+
+    def _cached(self, key: str):
+        result_file = os.path.join(self.artifact_dir(key), RESULT_FILE)
+        if not os.path.exists(result_file):
+            return None
+        with open(result_file) as f:
+            output = json.load(f).get("output", "")
+        os.utime(result_file)  # recency for pruning
+        return BuildResult(self.artifact_dir(key), output, cached=True)
+
+    async def compile(self, sketch_dir: str, fqbn: str) -> BuildResult:
+        """
+        Compile `sketch_dir` for `fqbn`, or reuse the artifact of an
+        identical earlier build.
+        """
+        key = build_key(sketch_dir, fqbn)
+        cached = self._cached(key)
+        if cached is not None:
+            self.cache_hits += 1
+            logger.info(f"Reusing build {key[:12]} for {fqbn}")
+            return cached
+        return await self._flights.do(key, lambda: self._compile(sketch_dir, fqbn, key))
+
+    async def _compile(self, sketch_dir: str, fqbn: str, key: str) -> BuildResult:
+        core_cache = os.path.join(self.root, "boards", _slug(fqbn), "core-cache")
+        out_dir = self.artifact_dir(key)
+        tmp_dir = out_dir + ".tmp"
+        os.makedirs(core_cache, exist_ok=True)
+        os.makedirs(os.path.join(self.root, "work"), exist_ok=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        build_path = tempfile.mkdtemp(prefix=f"{key[:12]}-", dir=os.path.join(self.root, "work"))
+
+        try:
+            async with self.semaphore:
+                logger.info(f"Compiling {sketch_dir} for {fqbn}")
+                output = await run_cli(
+                    "compile",
+                    "--fqbn", fqbn,
+                    "--build-path", build_path,
+                    "--build-cache-path", core_cache,
+                    "--output-dir", tmp_dir,
+                    sketch_dir,
+                )
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        finally:
+            shutil.rmtree(build_path, ignore_errors=True)
+        self.compiles += 1
+
+        with open(os.path.join(tmp_dir, RESULT_FILE), "w") as f:
+            json.dump({"fqbn": fqbn, "sketch": sketch_dir, "output": output}, f)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+        self._prune()
+        return BuildResult(out_dir, output, cached=False)
+
+    async def upload(self, sketch_dir: str, fqbn: str, port: str) -> str:
+        """
+        Flash the (cached or fresh) build of `sketch_dir` to `port`.
+        """
+        build = await self.compile(sketch_dir, fqbn)
+        # claimed before the next await, so no prune can run in between
+        with self._using(build.artifact_dir):
+            async with self._port_locks.setdefault(port, asyncio.Lock()):
+                logger.info(f"Uploading {sketch_dir} to {port}")
+                return await run_cli(
+                    "upload",
+                    "-p", port,
+                    "--fqbn", fqbn,
+                    "--input-dir", build.artifact_dir,
+                    sketch_dir,
+                )
+
+    @contextmanager
+    def _using(self, artifact_dir: str):
+        name = os.path.basename(artifact_dir)
+        self._in_use[name] = self._in_use.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_use[name] -= 1
+            if not self._in_use[name]:
+                del self._in_use[name]
+
+    def _prune(self) -> None:
+        """
+        Keep the most recently used artifacts, at most MAX_ARTIFACTS of
+        them and MAX_ARTIFACT_BYTES in total. Artifacts being uploaded
+        are kept regardless.
+        """
+        root = os.path.join(self.root, "artifacts")
+        entries = []
+        for name in os.listdir(root):
+            result_file = os.path.join(root, name, RESULT_FILE)
+            if os.path.exists(result_file):
+                entries.append((os.path.getmtime(result_file), name))
+
+        total = 0
+        for rank, (_, name) in enumerate(sorted(entries, reverse=True)):
+            path = os.path.join(root, name)
+            total += _dir_size(path)
+            if name in self._in_use:
+                continue
+            if rank >= MAX_ARTIFACTS or (rank > 0 and total > MAX_ARTIFACT_BYTES):
+                logger.info(f"Pruning build {name[:12]}")
+                shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self) -> Dict:
+        return {
+            "compiles": self.compiles,
+            "cache_hits": self.cache_hits,
+            "concurrency": self.concurrency,
+            **self._flights.stats(),
+        }
+
+
+compiler = ArduinoCompiler()
@@ -0,0 +1,179 @@
+"""
+Content-addressed store for generated sketches.
+
+A sketch's id is the hash of its code, so regenerating identical code
+reuses the same directory (and the compiler's cached build). Sessions
+map to the last sketch they generated, which is what compile/flash use
+when the client sends a session id instead of a sketch id.
+
+Everything lives on disk, so every uvicorn worker sees the same store:
+
+    sketches/store/sketch_<id>/sketch_<id>.ino     mtime = last use
+    sketches/store/sessions/<session hash>         current sketch id
+
+Sketches are evicted least-recently-used beyond MAX_SKETCHES. A client
+still holding an evicted id (e.g. from a cached /code-agent response)
+can send the code along with it, which stores the sketch again.
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("SketchStore")
+
+SKETCH_ROOT = os.getenv("SKETCH_STORE_ROOT", os.path.join(os.getcwd(), "sketches", "store"))
+MAX_SKETCHES = int(os.getenv("SKETCH_STORE_MAX_SKETCHES", "200"))
+MAX_SESSIONS = int(os.getenv("SKETCH_STORE_MAX_SESSIONS", "1000"))
+
+SESSIONS_DIR = "sessions"
+_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+
+class SketchNotFound(Exception):
+    pass
+
+
+def sketch_id_for(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+
+
+def _by_age(paths: List[str]) -> List[str]:
+    """
+    `paths` oldest first, skipping any that disappeared meanwhile.
+    """
+    aged = []
+    for path in paths:
+        try:
+            aged.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            pass
+    return [path for _, path in sorted(aged)]
+
+
+class SketchStore:
+    def __init__(
+        self,
+        root: str = SKETCH_ROOT,
+        max_sketches: int = MAX_SKETCHES,
+        max_sessions: int = MAX_SESSIONS,
+    ):
+        self.root = root
+        self.max_sketches = max_sketches
+        self.max_sessions = max_sessions
+        os.makedirs(os.path.join(self.root, SESSIONS_DIR), exist_ok=True)
+
+    # ---------- disk layout ----------
+
+    def sketch_dir(self, sketch_id: str) -> str:
+        return os.path.join(self.root, f"sketch_{sketch_id}")
+
+    def _session_file(self, session_id: str) -> str:
+        name = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.root, SESSIONS_DIR, name)
+
+    def _sketch_dirs(self) -> List[str]:
+        return [
+            os.path.join(self.root, name) for name in os.listdir(self.root)
+            if name.startswith("sketch_") and _ID_RE.match(name[len("sketch_"):])
+        ]
+
+    def _session_files(self) -> List[str]:
+        directory = os.path.join(self.root, SESSIONS_DIR)
+        return [os.path.join(directory, name) for name in os.listdir(directory)]
+
+    def _write(self, path: str, text: str) -> None:
+        # atomic, so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def _touch(self, sketch_id: str) -> bool:
+        try:
+            os.utime(self.sketch_dir(sketch_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    # ---------- public API ----------
+
+    def save(self, code: str, session_id: Optional[str] = None) -> str:
+        """
+        Store `code` (deduplicated) and make it the session's current
+        sketch. Returns the sketch id.
+        """
+        sketch_id = sketch_id_for(code)
+        sketch_dir = self.sketch_dir(sketch_id)
+        if not self._touch(sketch_id):
+            tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+            with open(os.path.join(tmp_dir, f"sketch_{sketch_id}.ino"), "w") as f:
+                f.write(code)
+            try:
+                os.replace(tmp_dir, sketch_dir)
+                logger.info(f"💾 Stored sketch {sketch_id}")
+            except OSError:
+                # another worker stored the same code first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                self._touch(sketch_id)
+
+        if session_id:
+            self._write(self._session_file(session_id), sketch_id)
+        self._collect()
+        return sketch_id
+
+    def resolve(
+        self,
+        sketch_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        code: Optional[str] = None,
+    ) -> str:
+        """
+        Directory of the requested sketch: by id, else the session's
+        current sketch. If it isn't stored (evicted) but the client sent
+        the `code`, that is stored again. There is no "latest sketch"
+        fallback, which would compile whatever another client generated
+        last.
+        """
+        if sketch_id and not _ID_RE.match(sketch_id):
+            raise SketchNotFound(f"Invalid sketch_id '{sketch_id}'.")
+        if not sketch_id and session_id:
+            try:
+                with open(self._session_file(session_id)) as f:
+                    sketch_id = f.read().strip()
+            except FileNotFoundError:
+                if not code:
+                    raise SketchNotFound(f"No sketch for session '{session_id}'. Run /code-agent first.")
+
+        if sketch_id and self._touch(sketch_id):
+            return self.sketch_dir(sketch_id)
+        if code:
+            return self.sketch_dir(self.save(code, session_id))
+        if sketch_id:
+            raise SketchNotFound(f"Unknown sketch_id '{sketch_id}'. Send its code or generate it again.")
+        raise SketchNotFound("sketch_id is required. Run /code-agent first and send the sketch_id it returns.")
+
+    def _collect(self) -> None:
+        """
+        Evict least recently used sketches and sessions beyond the limits.
+        """
+        sketches = _by_age(self._sketch_dirs())
+        for path in sketches[:max(len(sketches) - self.max_sketches, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Evicted {os.path.basename(path)}")
+        sessions = _by_age(self._session_files())
+        for path in sessions[:max(len(sessions) - self.max_sessions, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict:
+        return {"sketches": len(self._sketch_dirs()), "sessions": len(self._session_files())}
+
+
+sketch_store = SketchStore()
@@ -1,9 +1,9 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from app.core.llm import gemini_model
 from app.core.utils import retry_config
 
 individual_module_designer = LlmAgent(
-    model = Gemini(
+    model = gemini_model(
         model="gemini-2.5-flash-lite",
         retry_config=retry_config,
     ),
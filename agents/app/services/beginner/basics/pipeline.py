@@ -1,4 +1,3 @@
-from google.adk.agents import SequentialAgent
 import asyncio
 import logging
 import sys
@@ -14,14 +13,17 @@ from .curriculum import curriculum_agent
 from .search import search_agent
 from .modules import individual_module_designer
 from app.core.utils import run_agent
+from app.core.stage_cache import MemoizedSequentialAgent
 
 logger = logging.getLogger("ModulePipeline")
 
 load_dotenv()
 
-root_agent = SequentialAgent(
+# curriculum and resources depend only on the topic: reuse them across requests
+root_agent = MemoizedSequentialAgent(
     name="module_designer",
-    sub_agents=[curriculum_agent, search_agent, individual_module_designer]
+    sub_agents=[curriculum_agent, search_agent, individual_module_designer],
+    cached_stages=[curriculum_agent.name, search_agent.name],
 )
 
 # -------------------------
@@ -1,10 +1,10 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from app.core.llm import gemini_model
 from google.adk.tools import google_search
 from app.core.utils import retry_config
 
 search_agent = LlmAgent(
-    model = Gemini(
+    model = gemini_model(
         model = "gemini-2.5-flash-lite",
         retry_options=retry_config
     ),
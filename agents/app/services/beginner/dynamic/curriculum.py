@@ -1,11 +1,11 @@
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
+from app.core.llm import gemini_model
 from app.config import JSON_GENERATION_CONFIG
 from app.core.utils import retry_config
-from app.core.retriever import retrieve_content
+from app.core.retriever import aretrieve_content, aretrieve_content_batch
 
 curriculum_agent = Agent(
-    model = Gemini(
+    model = gemini_model(
         model="gemini-2.5-flash-lite",
         retry_config=retry_config,
         generation_config=JSON_GENERATION_CONFIG,
@@ -61,6 +61,6 @@ If retrieve returns insufficient or low-confidence matches:
 
 Focus on technical correctness, logical progression, and real-world applicability.
     """,
-    tools=[retrieve_content],
+    tools=[aretrieve_content, aretrieve_content_batch],
     output_key = "curriculum_designer",
 )
@@ -0,0 +1,257 @@
+"""
+Fan-out stage for the adaptive pipeline.
+
+Instead of one LLM call writing every module (one long generation that
+can hit max_output_tokens), the curriculum from `curriculum_designer` is
+split into its modules and each module is written by its own
+concurrent run of a single-module writer agent. The shared rate limiter
+in the model wrapper paces those calls. The results are merged, in
+curriculum order, into the usual {"modules": [...]} JSON and stored
+under the stage's output key.
+
+When the invocation streams (RunConfig SSE, the /stream endpoints), the
+writers' text is forwarded as it arrives in partial events authored
+"module_writer_agent.<n>" (n = module number), so clients can tell the
+interleaved modules apart.
+
+A module whose writer fails (or writes nothing) is retried once. If the
+curriculum can't be split, or a module still fails, the legacy
+single-shot agent writes all modules instead; if that writes nothing
+too, the stage raises, so no response with blank modules is returned
+(or cached).
+"""
+
+import re
+import json
+import time
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import StreamingMode
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.core.runner_pool import runner_pool
+from app.core.streaming import merge_streams, stream_agent
+from app.core.usage import TokenBudgetExceeded
+from app.core.utils import extract_text_from_events
+
+logger = logging.getLogger("ModuleFanOut")
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+def parse_json(text: Any) -> Optional[Any]:
+    """
+    Lenient JSON parse of model output (code fences, leading prose).
+    """
+    if not isinstance(text, str):
+        return text
+    text = _FENCE_RE.sub("", text.strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+    return None
+
+
+def find_modules(data: Any) -> List[Dict]:
+    """
+    The module list of a curriculum, wherever the model nested it:
+    the first list of objects found, preferring a "modules" key.
+    """
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data):
+            return data
+        for item in data:
+            found = find_modules(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            if key.lower() == "modules" and isinstance(value, list):
+                return [item for item in value if isinstance(item, dict)]
+        for value in data.values():
+            found = find_modules(value)
+            if found:
+                return found
+    return []
+
+
+def _field(module: Dict, *names: str) -> str:
+    lowered = {key.lower().replace("_", "").replace(" ", ""): value for key, value in module.items()}
+    for name in names:
+        value = lowered.get(name)
+        if value:
+            return value if isinstance(value, str) else json.dumps(value)
+    return ""
+
+
+def resources_by_title(resource_urls: Any) -> Dict[str, List[str]]:
+    data = parse_json(resource_urls) or {}
+    entries = data.get("resource_urls", []) if isinstance(data, dict) else data
+    out = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict):
+            title = str(entry.get("module_title", "")).strip().lower()
+            out[title] = [url for url in entry.get("urls", []) if isinstance(url, str)]
+    return out
+
+
+class ModuleFanOutAgent(BaseAgent):
+    """
+    Writes each curriculum module concurrently with `writer` and merges
+    them; falls back to `fallback` (all modules in one call).
+    """
+
+    writer: BaseAgent
+    fallback: BaseAgent
+    curriculum_key: str = "curriculum_designer"
+    resources_key: str = "resource_urls"
+    output_key: str = "adaptive_modules"
+
+    def _user_text(self, ctx: InvocationContext) -> str:
+        content = ctx.user_content
+        parts = getattr(content, "parts", None) or []
+        return "".join(part.text for part in parts if getattr(part, "text", None))
+
+    def _module_prompt(self, topic: str, modules: List[Dict], index: int, urls: List[str]) -> str:
+        others = [_field(m, "title") for i, m in enumerate(modules) if i != index]
+        return (
+            f"Project request: {topic}\n\n"
+            f"Write module {index + 1} of {len(modules)} of this curriculum:\n"
+            f"{json.dumps(modules[index], indent=2)}\n\n"
+            f"Other modules (covered separately, do not repeat them): {json.dumps(others)}\n\n"
+            f"Resource URLs for this module: {json.dumps(urls)}"
+        )
+
+    async def _write_module(self, index: int, prompt: str, spec: Dict) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        Write one module: yields (index, text delta) while the writer
+        generates, then (index, module dict), or (index, None) if the
+        writer failed or wrote no content.
+        """
+        title = _field(spec, "title")
+        chunks = []
+        try:
+            async for _, delta in stream_agent(self.writer, prompt):
+                chunks.append(delta)
+                yield index, delta
+        except TokenBudgetExceeded:
+            # fails the request; merge_streams cancels the other writers
+            raise
+        except Exception as e:
+            logger.error(f"❌ Module '{title}' failed: {e}")
+            yield index, None
+            return
+        text = "".join(chunks)
+
+        module = parse_json(text)
+        if isinstance(module, dict) and isinstance(module.get("modules"), list) and module["modules"]:
+            module = module["modules"][0]
+        if not isinstance(module, dict):
+            # keep whatever was written rather than dropping the module
+            module = {"content": text}
+        if not module.get("content"):
+            logger.error(f"❌ Module '{title}' came back empty")
+            yield index, None
+            return
+        yield index, {
+            "title": module.get("title") or title,
+            "subtitle": module.get("subtitle") or _field(spec, "subtitle"),
+            "content": module["content"],
+            "resources": module.get("resources") or [],
+        }
+
+    async def _write_modules(
+        self,
+        ctx: InvocationContext,
+        modules: List[Dict],
+        prompts: Dict[int, str],
+        written: List[Optional[Dict]],
+        stream: bool,
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Run the writers of `prompts` (module index -> prompt) concurrently
+        into `written`, yielding their deltas as partial events if
+        `stream`.
+        """
+        async for index, item in merge_streams(*(
+            self._write_module(i, prompt, modules[i]) for i, prompt in prompts.items()
+        )):
+            if item is None or isinstance(item, dict):
+                written[index] = item
+            elif stream:
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=f"{self.writer.name}.{index + 1}",
+                    branch=ctx.branch,
+                    partial=True,
+                    content=types.Content(role="model", parts=[types.Part(text=item)]),
+                )
+
+    async def _write_all(self, ctx: InvocationContext, topic: str) -> str:
+        """
+        All modules in one call of the single-shot `fallback` agent.
+        """
+        state = ctx.session.state
+        events = await runner_pool.run(
+            self.fallback,
+            topic,
+            state={key: state.get(key, "") for key in (self.curriculum_key, self.resources_key)},
+        )
+        output = extract_text_from_events(events, agent_name=self.fallback.name)
+        if not output.strip():
+            raise RuntimeError("Module generation failed")
+        return output
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        modules = find_modules(parse_json(state.get(self.curriculum_key)))
+        topic = self._user_text(ctx)
+
+        if modules:
+            urls = resources_by_title(state.get(self.resources_key))
+            all_urls = list(dict.fromkeys(url for group in urls.values() for url in group))
+            prompts = {
+                i: self._module_prompt(topic, modules, i, urls.get(_field(spec, "title").strip().lower(), all_urls))
+                for i, spec in enumerate(modules)
+            }
+            streaming = ctx.run_config is not None and ctx.run_config.streaming_mode == StreamingMode.SSE
+            written: List[Optional[Dict]] = [None] * len(modules)
+            start = time.perf_counter()
+            async for event in self._write_modules(ctx, modules, prompts, written, streaming):
+                yield event
+
+            failed = [i for i, module in enumerate(written) if module is None]
+            if failed:
+                # retried quietly: streaming them again would repeat their deltas
+                logger.warning(f"Retrying {len(failed)} failed modules")
+                async for event in self._write_modules(ctx, modules, {i: prompts[i] for i in failed}, written, False):
+                    yield event
+            logger.info(f"Wrote {len(written)} modules in {time.perf_counter() - start:.1f}s")
+
+            if any(module is None for module in written):
+                logger.warning("Some modules failed twice, writing them all in one call")
+                output = await self._write_all(ctx, topic)
+            else:
+                output = json.dumps({"modules": written}, ensure_ascii=False)
+        else:
+            logger.warning("Could not split the curriculum into modules, writing them in one call")
+            output = await self._write_all(ctx, topic)
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=output)]),
+            actions=EventActions(state_delta={self.output_key: output}),
+        )
@@ -1,32 +1,11 @@
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
+from app.core.llm import gemini_model
 from app.core.utils import retry_config
-from app.core.retriever import retrieve_content
+from app.core.retriever import aretrieve_content, aretrieve_content_batch
+from .fanout import ModuleFanOutAgent
 
-adaptive_modules_agent = Agent(
-    model = Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_config=retry_config,
-    ),
-    name="adaptive_modules_agent",
-    description="Dynamically generates project-aligned, debugging-focused learning modules.",
-    instruction="""You are a senior embedded systems engineer and educator responsible for expanding a curriculum roadmap into deep, technically grounded learning modules.
-
-You will receive structured input under the key {curriculum_designer}. This input defines:
-- Module titles
-- Learning goals
-- Key topics
-- Learning approach
-- Assessment approach
-
-You must strictly follow this curriculum. Do not invent new modules, change scope, or introduce components not present in the curriculum.
-
-You will also receive structured resource data under the key {resource_urls}. These resources are retrieved from a verified search process and may represent partial or fragmented technical sources. Treat them as authoritative inputs. Do not fabricate or substitute links.
-
-Your task:
-For each module, generate a detailed technical learning module that helps a student understand how the system behaves in real hardware and software.
-
-The objective is not simplification or summarization — the objective is to build engineering intuition and causal understanding.
+# Shared by the per-module writer and the single-shot agent.
+MODULE_GUIDELINES = """The objective is not simplification or summarization — the objective is to build engineering intuition and causal understanding.
 
 Each module must:
 - Explain what happens electrically, logically, and at the system level.
@@ -55,7 +34,98 @@ Specific Technical Requirements:
 3. **Blocking vs Non-Blocking:** When discussing timing or sensors (like ultrasonic), explicitly mention the downsides of blocking functions (like `delay()` or `pulseIn()`) and suggest non-blocking alternatives (like `millis()` or interrupts) for robust systems.
 4. **Real-World Debugging:** Every module involving hardware MUST have a concrete "Debugging Strategies" section (e.g., "If the servo jitters... Check power supply current").
 
-Resources:
+"""
+
+MODULE_FORMATTING = """Formatting inside JSON strings:
+- Use short paragraphs for readability.
+- Use bullet points sparingly only when listing concrete technical constraints or parameters.
+- Use bold formatting only for key technical terms, signals, registers, interfaces, and components.
+- Avoid stylistic or decorative formatting.
+
+You are implementing the curriculum — not redesigning it.
+Focus on technical correctness, causal clarity, and real-world engineering behavior.
+Write as an engineer explaining a system to another engineer.
+
+"""
+
+module_writer_agent = Agent(
+    model = gemini_model(
+        model="gemini-2.5-flash-lite",
+        retry_config=retry_config,
+    ),
+    name="module_writer_agent",
+    description="Writes one project-aligned, debugging-focused learning module.",
+    instruction="""You are a senior embedded systems engineer and educator responsible for expanding ONE module of a curriculum roadmap into a deep, technically grounded learning module.
+
+The message gives you:
+- The project the student is building.
+- The specification of your module from the curriculum (title, learning goals, key topics, learning approach, assessment approach).
+- The titles of the other modules, which are written separately. Do not cover their content.
+- The resource URLs retrieved for your module. These come from a verified search process and may represent partial or fragmented technical sources. Treat them as authoritative inputs. Do not fabricate or substitute links.
+
+You must strictly follow the module specification. Do not change its scope or introduce components not present in it.
+
+Your task:
+Generate a detailed technical learning module that helps a student understand how the system behaves in real hardware and software.
+
+""" + MODULE_GUIDELINES + """Resources:
+- Use only the URLs given in the message.
+- Do not invent, modify, or replace URLs.
+- Select the URLs most relevant to this module based on technical alignment.
+
+OUTPUT FORMAT (STRICT — DO NOT CHANGE):
+
+The output must be valid JSON only.
+Do NOT generate Python code or scripts.
+Do NOT use code blocks like ```python ... ```.
+Do not include markdown, headings, commentary, or surrounding text.
+
+The structure must be exactly one module object:
+
+{
+  "title": "string",
+  "subtitle": "string",
+  "content": "string",
+  "resources": [
+    { "name": "string", "url": "string" }
+  ]
+}
+
+Rules:
+- Include all four fields exactly as shown.
+- Use the module title from the specification.
+- Output must contain only JSON and nothing else.
+
+""" + MODULE_FORMATTING,
+    tools=[aretrieve_content, aretrieve_content_batch],
+)
+
+# Writes every module in one call; used when the curriculum can't be
+# split into modules.
+adaptive_modules_single_agent = Agent(
+    model = gemini_model(
+        model="gemini-2.5-flash-lite",
+        retry_config=retry_config,
+    ),
+    name="adaptive_modules_single_agent",
+    description="Dynamically generates project-aligned, debugging-focused learning modules.",
+    instruction="""You are a senior embedded systems engineer and educator responsible for expanding a curriculum roadmap into deep, technically grounded learning modules.
+
+You will receive structured input under the key {curriculum_designer}. This input defines:
+- Module titles
+- Learning goals
+- Key topics
+- Learning approach
+- Assessment approach
+
+You must strictly follow this curriculum. Do not invent new modules, change scope, or introduce components not present in the curriculum.
+
+You will also receive structured resource data under the key {resource_urls}. These resources are retrieved from a verified search process and may represent partial or fragmented technical sources. Treat them as authoritative inputs. Do not fabricate or substitute links.
+
+Your task:
+For each module, generate a detailed technical learning module that helps a student understand how the system behaves in real hardware and software.
+
+""" + MODULE_GUIDELINES + """Resources:
 - Use only the URLs provided in {resource_urls}.
 - Do not invent, modify, or replace URLs.
 - Select the most relevant URLs for each module based on technical alignment.
@@ -90,17 +160,15 @@ Rules:
 - Modules must align one-to-one with the curriculum structure.
 - Do not reorder modules unless explicitly required by the curriculum.
 
-Formatting inside JSON strings:
-- Use short paragraphs for readability.
-- Use bullet points sparingly only when listing concrete technical constraints or parameters.
-- Use bold formatting only for key technical terms, signals, registers, interfaces, and components.
-- Avoid stylistic or decorative formatting.
-
-You are implementing the curriculum — not redesigning it.
-Focus on technical correctness, causal clarity, and real-world engineering behavior.
-Write as an engineer explaining a system to another engineer.
+""" + MODULE_FORMATTING,
+    output_key="adaptive_modules",
+    tools=[aretrieve_content, aretrieve_content_batch],
+)
 
-""",
+adaptive_modules_agent = ModuleFanOutAgent(
+    name="adaptive_modules_agent",
+    description="Writes the curriculum's learning modules concurrently, one writer call per module.",
+    writer=module_writer_agent,
+    fallback=adaptive_modules_single_agent,
     output_key="adaptive_modules",
-    tools=[retrieve_content],
 )
@@ -1,5 +1,3 @@
-from google.adk.agents import SequentialAgent
-from google.adk.runners import InMemoryRunner
 import asyncio
 import logging
 import sys
@@ -12,14 +10,18 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from .curriculum import curriculum_agent
 from .search import search_agent
 from .modules import adaptive_modules_agent
+from app.core.utils import run_agent
+from app.core.stage_cache import MemoizedSequentialAgent
 
 logger = logging.getLogger("ModulePipeline")
 
 load_dotenv()
 
-root_agent = SequentialAgent(
+# curriculum and resources depend only on the topic: reuse them across requests
+root_agent = MemoizedSequentialAgent(
     name="project_based_modules",
-    sub_agents=[curriculum_agent, search_agent, adaptive_modules_agent]
+    sub_agents=[curriculum_agent, search_agent, adaptive_modules_agent],
+    cached_stages=[curriculum_agent.name, search_agent.name],
 )
 
 
@@ -30,9 +32,10 @@ How to make a Smart Dustbin using Arduino
 
 async def run_initial_modules_agent():
     try:
-        runner = InMemoryRunner(agent=root_agent)
-        response = await runner.run_debug(
-           DEFAULT_PROMPT
+        response = await run_agent(
+            agent=root_agent,
+            prompt=DEFAULT_PROMPT,
+            target_agent="adaptive_modules_agent",
         )
 
         # Print raw model output
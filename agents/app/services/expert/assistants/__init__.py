@@ -1,5 +1,5 @@
-from .description import desc_runner
-from .wiring import wiring_runner
-from .code import code_runner
-from .troubleshoot import qa_runner
-from .classifier import name_runner
+from .description import desc_agent
+from .wiring import wiring_agent
+from .code import code_agent
+from .troubleshoot import qa_agent
+from .classifier import name_agent
@@ -1,12 +1,12 @@
 from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from app.core.retriever import retrieve_code
+from app.core.llm import gemini_model
+from app.core.retriever import aretrieve_code, aretrieve_code_batch
 
 code_agent = Agent(
-    model='gemini-2.5-flash-lite',
+    model=gemini_model('gemini-2.5-flash-lite'),
     name='code_agent',
     description='Extracts code for the project.',
-    tools=[retrieve_code], # Uses the RAG agent as a tool
+    tools=[aretrieve_code, aretrieve_code_batch], # Uses the RAG agent as a tool
     instruction="""You are a senior embedded systems and software engineer.
 
 Your job is to output ONLY the final, complete, production-ready code for the requested project.
@@ -61,4 +61,3 @@ No text after.
 Only the final best possible code.
     """
 )
-code_runner = InMemoryRunner(agent=code_agent)
@@ -1,9 +1,9 @@
 from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from app.core.retriever import retrieve_content
+from app.core.llm import gemini_model
+from app.core.retriever import aretrieve_content, aretrieve_content_batch
 
 desc_agent = Agent(
-    model='gemini-2.5-flash-lite',
+    model=gemini_model('gemini-2.5-flash-lite'),
     name='desc_agent',
     description='Provides project description and briefing.',
     instruction="""You are a senior electronics engineer, technical architect, and professional technical documentation writer.
@@ -155,7 +155,6 @@ If insufficient data found:
 Return:
 "Insufficient project description data found in knowledge base."
     """,
-    tools=[retrieve_content],
+    tools=[aretrieve_content, aretrieve_content_batch],
     output_key="description"
 )
-desc_runner = InMemoryRunner(agent=desc_agent)
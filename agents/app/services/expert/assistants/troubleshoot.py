@@ -1,12 +1,12 @@
 from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from app.core.retriever import retrieve_content
+from app.core.llm import gemini_model
+from app.core.retriever import aretrieve_content, aretrieve_content_batch
 
 qa_agent = Agent(
-    model='gemini-2.5-flash-lite',
+    model=gemini_model('gemini-2.5-flash-lite'),
     name='qa_agent',
     description='Advanced electronics and embedded systems troubleshooting expert.',
-    tools=[retrieve_content],
+    tools=[aretrieve_content, aretrieve_content_batch],
     output_key="answer",
     instruction="""
 You are a senior electronics diagnostic engineer and embedded systems debugger.
@@ -109,5 +109,3 @@ Return:
 "Unable to diagnose: insufficient project context."
 """
 )
-
-qa_runner = InMemoryRunner(agent=qa_agent)
@@ -1,9 +1,9 @@
 from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from app.core.retriever import retrieve_content
+from app.core.llm import gemini_model
+from app.core.retriever import aretrieve_content, aretrieve_content_batch
 
 wiring_agent = Agent(
-    model='gemini-2.5-flash-lite',
+    model=gemini_model('gemini-2.5-flash-lite'),
     name='wiring_agent',
     description='Provides components, wiring, and building steps.',
     instruction="""You are a senior electronics hardware engineer and embedded systems expert.
@@ -136,7 +136,6 @@ This output should be good enough that:
 A student can build the project successfully
 WITHOUT searching the internet.
     """,
-    tools=[retrieve_content],
+    tools=[aretrieve_content, aretrieve_content_batch],
     output_key="wiring_steps"
 )
-wiring_runner = InMemoryRunner(agent=wiring_agent)
@@ -0,0 +1,61 @@
+"""
+Helpers shared by the benchmark scripts: percentiles and result files
+that can be compared between commits.
+"""
+
+import os
+import json
+import time
+import platform
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=AGENTS_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def latency_summary(seconds: List[float]) -> Dict:
+    """
+    p50/p95/p99/mean/max of a list of durations, in milliseconds.
+    """
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def write_results(benchmark: str, config: Dict, results: Dict, path: Optional[str] = None) -> Dict:
+    """
+    Wrap results with the commit and environment they were measured on;
+    written to `path` as JSON when given.
+    """
+    report = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "results": results,
+    }
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
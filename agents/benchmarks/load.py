@@ -0,0 +1,240 @@
+"""
+End-to-end load benchmark of the agents API, runnable offline.
+
+    python -m benchmarks.load                                  # all agent routes
+    python -m benchmarks.load --routes /code-agent /main-agent/stream -c 16 -n 64
+    python -m benchmarks.load --json results.json              # compare between commits
+
+By default the app runs in-process (httpx ASGI transport) with FAKE_LLM
+and FAKE_EMBEDDINGS enabled (see app.core.fakes), a generous Gemini
+rate limit and throwaway cache/sketch directories, so it needs no
+network and no API keys. Shape the fake model with the FAKE_LLM_*
+variables (latency, token rate, 429 rate).
+
+Each route gets `--requests` requests at `--concurrency`, one route
+after the other. Topics are unique per request unless --repeat-topics,
+which measures the cached path instead. Reported per route: p50/p95/p99
+latency, throughput and errors; for /stream routes also the time to the
+first byte. The in-process transport buffers response bodies, so use
+--url against a running server (started with the same FAKE_* variables)
+for meaningful time-to-first-byte numbers.
+
+Needs httpx on top of the service's requirements:
+
+    pip install -r benchmarks/requirements.txt
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.common import latency_summary, write_results
+
+TOPICS = [
+    "Smart Dustbin",
+    "Gas Leak Detector",
+    "Line Following Robot",
+    "Automatic Plant Watering System",
+    "Ultrasonic Distance Meter",
+    "Temperature and Humidity Monitor",
+    "RFID Door Lock",
+    "Obstacle Avoiding Car",
+]
+
+FQBN = "arduino:avr:uno"
+
+
+def _project(topic: str, i: int) -> Dict:
+    return {"project_topic": topic, "session_id": f"bench-{i}"}
+
+
+# route -> (method, request body for (topic, request index))
+ROUTES: Dict[str, Tuple[str, Callable[[str, int], Dict]]] = {
+    "/project-name": ("POST", lambda topic, i: {"user_description": f"something like a {topic.lower()}"}),
+    "/main-agent": ("POST", _project),
+    "/code-agent": ("POST", _project),
+    "/beginner/basics": ("POST", _project),
+    "/beginner/adaptive": ("POST", _project),
+    "/troubleshoot": ("POST", lambda topic, i: {"query": "It doesn't respond after upload", "project_topic": topic}),
+    "/main-agent/stream": ("POST", _project),
+    "/code-agent/stream": ("POST", _project),
+    "/beginner/basics/stream": ("POST", _project),
+    "/beginner/adaptive/stream": ("POST", _project),
+    "/troubleshoot/stream": ("POST", lambda topic, i: {"query": "It doesn't respond after upload", "project_topic": topic}),
+    "/cache/stats": ("GET", None),
+    "/usage": ("GET", None),
+    "/metrics": ("GET", None),
+    "/healthz": ("GET", None),
+    "/readyz": ("GET", None),
+    # need arduino-cli (and a board for flashing)
+    "/arduino/compile": ("POST", lambda topic, i: {"fqbn": FQBN, "session_id": f"bench-{i}"}),
+    "/arduino/flash": ("POST", lambda topic, i: {"fqbn": FQBN, "port": os.getenv("BENCH_PORT", "/dev/ttyUSB0"), "session_id": f"bench-{i}"}),
+    "/arduino/boards": ("GET", None),
+    "/arduino/boards/changes": ("GET", None),
+}
+
+DEFAULT_ROUTES = [route for route in ROUTES if not route.startswith("/arduino")]
+
+
+def offline_environment(workdir: str) -> None:
+    """
+    Fakes on, rate limit out of the way, caches in `workdir`. Explicit
+    environment variables win.
+    """
+    defaults = {
+        "FAKE_LLM": "1",
+        "FAKE_EMBEDDINGS": "1",
+        "GEMINI_RPM": "100000",
+        "GEMINI_BURST": "1000",
+        "RESPONSE_CACHE_PATH": os.path.join(workdir, "responses.sqlite3"),
+        "STAGE_CACHE_PATH": os.path.join(workdir, "stages.sqlite3"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"),
+        "SKETCH_STORE_ROOT": os.path.join(workdir, "sketches"),
+        "ARDUINO_BUILD_ROOT": os.path.join(workdir, "build"),
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+async def _request(client: httpx.AsyncClient, route: str, topic: str, i: int) -> Dict:
+    method, body = ROUTES[route]
+    kwargs = {"json": body(topic, i)} if body else {}
+    start = time.perf_counter()
+    first_byte = None
+    error = None
+    try:
+        async with client.stream(method, route, **kwargs) as response:
+            chunks = []
+            async for chunk in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                chunks.append(chunk)
+            body_text = b"".join(chunks).decode(errors="replace")
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+            elif route.endswith("/stream") and "event: error" in body_text:
+                error = "stream error frame"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return {"latency": time.perf_counter() - start, "first_byte": first_byte, "error": error}
+
+
+async def bench_route(
+    client: httpx.AsyncClient,
+    route: str,
+    requests: int,
+    concurrency: int,
+    repeat_topics: bool,
+    offset: int,
+) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def topic_for(i: int) -> str:
+        topic = TOPICS[i % len(TOPICS)]
+        return topic if repeat_topics else f"{topic} {offset + i}"
+
+    async def one(i: int) -> Dict:
+        async with semaphore:
+            return await _request(client, route, topic_for(i), offset + i)
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if sample["error"]:
+            errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        **latency_summary([s["latency"] for s in samples]),
+    }
+    if route.endswith("/stream"):
+        ttfb = latency_summary([s["first_byte"] for s in samples if s["first_byte"] is not None])
+        result["ttfb"] = ttfb
+    return result
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    header = f"{'route':<28} {'req':>5} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, r in results.items():
+        print(
+            f"{route:<28} {r['requests']:>5} {sum(r['errors'].values()):>5} {r['throughput_rps']:>8}"
+            f" {r.get('p50_ms', 0):>9} {r.get('p95_ms', 0):>9} {r.get('p99_ms', 0):>9}"
+        )
+
+
+async def run(args) -> Dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        # imported only now, so the offline environment applies to the app
+        from app.server import app
+        from app.api.deps import warm_up
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout
+        )
+        # the ASGI transport doesn't run the lifespan that starts it
+        await warm_up()
+
+    results = {}
+    async with client:
+        for n, route in enumerate(args.routes):
+            offset = n * (args.requests + args.warmup)
+            if args.warmup:
+                await bench_route(client, route, args.warmup, args.warmup, args.repeat_topics, offset)
+            results[route] = await bench_route(
+                client, route, args.requests, args.concurrency, args.repeat_topics, offset + args.warmup
+            )
+            print(f"  {route}: p50 {results[route].get('p50_ms')} ms", file=sys.stderr)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load benchmark of the agents API")
+    parser.add_argument("--routes", nargs="+", default=DEFAULT_ROUTES, help=f"any of: {', '.join(ROUTES)} (or 'all')")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="requests per route")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1, help="unrecorded requests per route")
+    parser.add_argument("--repeat-topics", action="store_true", help="reuse topics (measures cache hits)")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.routes == ["all"]:
+        args.routes = list(ROUTES)
+    unknown = [route for route in args.routes if route not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="agents-bench-") as workdir:
+        if not args.url:
+            offline_environment(workdir)
+        results = asyncio.run(run(args))
+
+    print_table(results)
+    config = {
+        key: value for key, value in vars(args).items() if key != "json"
+    }
+    config["env"] = {key: value for key, value in os.environ.items() if key.startswith(("FAKE_", "GEMINI_"))}
+    write_results("load", config, results, args.json)
+    if args.json:
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Retrieval micro-benchmark over the shipped FAISS stores.
+
+    python -m benchmarks.retrieval                       # faiss_content + faiss_code
+    python -m benchmarks.retrieval --stores app/core/faiss_code --repeat 50 --json retrieval.json
+    FAKE_EMBEDDINGS=1 python -m benchmarks.retrieval     # offline
+
+Queries come from fixtures/retrieval_queries.json. Their embeddings are
+computed once with the configured embedder and kept next to it as
+query_vectors.<model>.npy, so every commit is measured on the same
+vectors. Each query runs through the same steps as
+retriever._retrieve, timed one by one:
+
+    embed     upstream embedding call (uncached, once per query)
+    search    FAISS search_by_vector
+    sort      the re-sort of the dense hits inside _fuse
+    keyword   BM25 search
+    fuse      reciprocal-rank fusion (includes the sort above)
+    fetch     docstore decode of the winning rows
+    pack      dedupe + token-budget packing
+    format    context string formatting (_build_context)
+    total     _retrieve end to end (embedding excluded)
+
+Also reported per store: cold load time of the index, docstore and
+sparse index, and process RSS after each load. Results are printed as
+JSON (with the commit hash) for comparison between commits.
+
+    python -m benchmarks.retrieval --check               # exact-identifier regression check
+
+--check runs the queries in fixtures/exact_identifier_queries.json (pin
+names, part numbers) through _retrieve on the content store instead of
+timing anything. Each must keep BM25's top hit in the fused context and
+return its expected project; the exit status is 1 if any doesn't.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.common import latency_summary, write_results
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+QUERIES_FILE = os.path.join(FIXTURES_DIR, "retrieval_queries.json")
+EXACT_QUERIES_FILE = os.path.join(FIXTURES_DIR, "exact_identifier_queries.json")
+
+PHASES = ("embed", "search", "sort", "keyword", "fuse", "fetch", "pack", "format", "total")
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size (peak RSS where /proc isn't available).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_fixture(embeddings) -> tuple:
+    """
+    (queries, vectors): vectors are embedded on the first run with this
+    model and reused afterwards.
+    """
+    with open(QUERIES_FILE) as f:
+        queries = json.load(f)
+    model = embeddings.model.replace("/", "_")
+    path = os.path.join(FIXTURES_DIR, f"query_vectors.{model}.npy")
+    if os.path.exists(path):
+        vectors = np.load(path)
+        if len(vectors) == len(queries):
+            return queries, vectors
+    print(f"Embedding {len(queries)} fixture queries with {embeddings.model}", file=sys.stderr)
+    vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    np.save(path, vectors)
+    return queries, vectors
+
+
+def load_store(path: str, embeddings) -> tuple:
+    """
+    Open a store and time the cold load of each component.
+    """
+    from app.core.vectorstore import LazyVectorStore
+    from app.core.retriever import INDEX_VARIANT, NPROBE, EF_SEARCH
+
+    db = LazyVectorStore(path, embeddings, variant=INDEX_VARIANT, nprobe=NPROBE, ef_search=EF_SEARCH)
+    load, memory = {}, {"before_mb": rss_mb()}
+    for part in ("index", "docstore", "sparse"):
+        start = time.perf_counter()
+        getattr(db, part)
+        load[f"{part}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        memory[f"after_{part}_mb"] = rss_mb()
+    load["rows"] = int(db.index.ntotal)
+    return db, load, memory
+
+
+def time_phases(db, queries: List[str], vectors: np.ndarray, repeat: int, keyword_weight: float) -> Dict:
+    from app.core import retriever
+    from app.core.context import CONTEXT_TOKEN_BUDGET, pack_context
+
+    timings: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+
+    def timed(phase, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[phase].append(time.perf_counter() - start)
+        return result
+
+    for query, vector in zip(queries, vectors):
+        timed("embed", db.embeddings.upstream.embed_query, query)
+        vector = vector.tolist()
+        for _ in range(repeat):
+            dense = timed("search", db.search_by_vector, vector, k=retriever.MAX_RESULTS)
+            timed("sort", sorted, dense, key=lambda x: x[1])
+            keyword = timed("keyword", db.keyword_search, query, k=retriever.MAX_RESULTS) if keyword_weight > 0 else []
+            hits = timed("fuse", retriever._fuse, dense, keyword, keyword_weight)[:retriever.FINAL_CONTEXT_LIMIT]
+            docs = timed("fetch", db.get_documents, [row for row, _ in hits])
+            docs, _ = timed("pack", pack_context, list(zip(docs, [score for _, score in hits])), CONTEXT_TOKEN_BUDGET)
+            timed("format", retriever._build_context, docs)
+            result = timed("total", retriever._retrieve, db, query, "bench", keyword_weight, vector=vector)
+            if result.get("status") == "error":
+                raise RuntimeError(result.get("reason"))
+
+    return {phase: latency_summary(values) for phase, values in timings.items() if values}
+
+
+def check_exact_identifiers(db, keyword_weight: float) -> List[Dict]:
+    """
+    Hybrid ranking must not drown exact-term matches: for each fixture
+    query, BM25's own top hit has to survive fusion into the context.
+    """
+    from app.core import retriever
+
+    with open(EXACT_QUERIES_FILE) as f:
+        cases = json.load(f)
+    results = []
+    for case in cases:
+        query = case["query"]
+        keyword = db.keyword_search(query, k=1)
+        result = retriever._retrieve(db, query, "check", keyword_weight)
+        if result.get("status") == "error":
+            raise RuntimeError(result.get("reason"))
+        contents = [match["content"] for match in result.get("matches", [])]
+        titles = [match["metadata"].get("title", "") for match in result.get("matches", [])]
+        top_keyword = db.get_documents([keyword[0][0]])[0].page_content if keyword else None
+        results.append({
+            "query": query,
+            "keyword_top_kept": top_keyword is None or top_keyword in contents,
+            "expected_found": any(case["expect"].lower() in title.lower() for title in titles),
+            "titles": titles,
+        })
+    return results
+
+
+def main(argv=None) -> None:
+    from app.core import retriever
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", nargs="+", default=[retriever.CONTENT_DB_PATH, retriever.CODE_DB_PATH])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query (embedding: once)")
+    parser.add_argument("--keyword-weight", type=float, default=retriever.KEYWORD_WEIGHT)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--check", action="store_true", help="run the exact-identifier regression check instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        db, _, _ = load_store(args.stores[0], retriever.embeddings)
+        results = check_exact_identifiers(db, args.keyword_weight)
+        print(json.dumps(results, indent=2))
+        failed = [r["query"] for r in results if not (r["keyword_top_kept"] and r["expected_found"])]
+        if failed:
+            print(f"FAILED: {', '.join(failed)}", file=sys.stderr)
+            sys.exit(1)
+        print(f"OK: {len(results)} exact-identifier queries", file=sys.stderr)
+        return
+
+    queries, vectors = load_fixture(retriever.embeddings)
+    results = {}
+    for path in args.stores:
+        db, load, memory = load_store(path, retriever.embeddings)
+        phases = time_phases(db, queries, vectors, args.repeat, args.keyword_weight)
+        memory["after_queries_mb"] = rss_mb()
+        results[os.path.basename(os.path.normpath(path))] = {
+            "load": load,
+            "memory": memory,
+            "phases": phases,
+        }
+
+    config = {
+        "stores": args.stores,
+        "queries": len(queries),
+        "repeat": args.repeat,
+        "keyword_weight": args.keyword_weight,
+        "embedding_model": retriever.embeddings.model,
+        "index_variant": retriever.INDEX_VARIANT,
+        "max_results": retriever.MAX_RESULTS,
+        "context_limit": retriever.FINAL_CONTEXT_LIMIT,
+    }
+    report = write_results("retrieval", config, results, args.json)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,5 +8,7 @@ if __name__ == "__main__":
     
     # Reload assumes we are running from root and the app is in proper package structure
     # However since server.py was moved to app/, we reference app.server:app
-    uvicorn.run("app.server:app", host="0.0.0.0", port=8000, reload=True)
-
+    # Auto-reload (a file watcher + a worker restart on every change) is
+    # for local development only: UVICORN_RELOAD=1
+    reload = os.getenv("UVICORN_RELOAD", "0").lower() in ("1", "true", "yes")
+    uvicorn.run("app.server:app", host="0.0.0.0", port=8000, reload=reload)
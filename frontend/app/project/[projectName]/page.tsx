@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useCallback } from 'react'
 import { useParams } from 'next/navigation'
 import { Button } from '@/components/ui/button'
 import { ModuleViewer } from '@/components/module-viewer'
@@ -40,6 +40,7 @@ export default function ProjectPage() {
   const [activeStep, setActiveStep] = useState<RoadmapStep>('basics')
   const [showCompletionModal, setShowCompletionModal] = useState(false)
   const [generatedCode, setGeneratedCode] = useState('')
+  const [sketchId, setSketchId] = useState('')
   const [stepStatus, setStepStatus] = useState<StepStatus>({
     basics: 'active',
     overview: 'locked',
@@ -49,6 +50,11 @@ export default function ProjectPage() {
     troubleshoot: 'locked',
   })
 
+  const handleCodeGenerated = useCallback((code: string, id: string) => {
+    setGeneratedCode(code)
+    setSketchId(id)
+  }, [])
+
   const handleStepComplete = (step: RoadmapStep) => {
     const stepOrder: RoadmapStep[] = ['basics', 'overview', 'wiring', 'code', 'flash', 'troubleshoot']
     const currentIndex = stepOrder.indexOf(step)
@@ -116,9 +122,9 @@ export default function ProjectPage() {
       case 'wiring':
         return <WiringAgent projectName={projectName} onComplete={() => handleStepComplete('wiring')} />
       case 'code':
-        return <CodeAgent projectName={projectName} onCodeGenerated={setGeneratedCode} onComplete={() => handleStepComplete('code')} />
+        return <CodeAgent projectName={projectName} onCodeGenerated={handleCodeGenerated} onComplete={() => handleStepComplete('code')} />
       case 'flash':
-        return <CompileAgent projectName={projectName} code={generatedCode} onComplete={() => handleStepComplete('flash')} />
+        return <CompileAgent projectName={projectName} code={generatedCode} sketchId={sketchId} onComplete={() => handleStepComplete('flash')} />
       case 'troubleshoot':
         return <TroubleshootAgent projectName={projectName} onComplete={() => handleStepComplete('troubleshoot')} />
       default:
@@ -17,7 +17,7 @@ import { vscDarkPlus } from 'react-syntax-highlighter/dist/esm/styles/prism';
 
 interface CodeAgentProps {
   projectName: string;
-  onCodeGenerated?: (code: string) => void;
+  onCodeGenerated?: (code: string, sketchId: string) => void;
   onComplete?: () => void;
 }
 
@@ -38,7 +38,7 @@ export function CodeAgent({
 
         setCode(generatedCode);
         if (onCodeGenerated) {
-          onCodeGenerated(generatedCode);
+          onCodeGenerated(generatedCode, data.sketch_id || "");
         }
       } catch (error) {
         console.error("Error fetching code:", error);
@@ -20,10 +20,11 @@ import { checkBoards, compileProject, flashProject } from '@/lib/api'
 interface CompileAgentProps {
   projectName: string
   code: string
+  sketchId: string
   onComplete: () => void
 }
 
-export function CompileAgent({ projectName, code, onComplete }: CompileAgentProps) {
+export function CompileAgent({ projectName, code, sketchId, onComplete }: CompileAgentProps) {
   const [isCompiling, setIsCompiling] = useState(false)
   const [isFlashing, setIsFlashing] = useState(false)
   const [compileStatus, setCompileStatus] = useState<'idle' | 'success' | 'error'>('idle')
@@ -77,7 +78,10 @@ export function CompileAgent({ projectName, code, onComplete }: CompileAgentProp
     setLogs(['Starting compilation...', `Target Board: ${detectedFqbn}`])
     
     try {
-      const result = await compileProject(detectedFqbn)
+      if (!sketchId) {
+        throw new Error('No generated sketch to compile. Generate the code first.')
+      }
+      const result = await compileProject(sketchId, code, detectedFqbn)
       if (result.success) {
         setLogs((prev) => [...prev, 'Compilation successful!', result.message])
         setCompileStatus('success')
@@ -106,7 +110,7 @@ export function CompileAgent({ projectName, code, onComplete }: CompileAgentProp
     setLogs((prev) => [...prev, '', `Starting upload to ${detectedPort}...`])
     
     try {
-      const result = await flashProject(detectedFqbn, detectedPort)
+      const result = await flashProject(sketchId, code, detectedFqbn, detectedPort)
       if (result.success) {
         setLogs((prev) => [...prev, 'Upload successful!', result.message])
         setFlashStatus('success')
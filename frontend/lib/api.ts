@@ -69,11 +69,11 @@ export async function checkBoards() {
   return res.json();
 }
 
-export async function compileProject(fqbn: string = 'arduino:avr:uno') {
+export async function compileProject(sketchId: string, code: string, fqbn: string = 'arduino:avr:uno') {
   const res = await fetch(`${API_URL}/arduino/compile`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ fqbn }),
+    body: JSON.stringify({ fqbn, sketch_id: sketchId, code }),
   });
   if (!res.ok) {
     const errorData = await res.json();
@@ -82,11 +82,11 @@ export async function compileProject(fqbn: string = 'arduino:avr:uno') {
   return res.json();
 }
 
-export async function flashProject(fqbn: string, port: string) {
+export async function flashProject(sketchId: string, code: string, fqbn: string, port: string) {
   const res = await fetch(`${API_URL}/arduino/flash`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ fqbn, port }),
+    body: JSON.stringify({ fqbn, port, sketch_id: sketchId, code }),
   });
   if (!res.ok) {
     const errorData = await res.json();